@@ -1,9 +1,16 @@
 import streamlit as st
-import pickle
-import numpy as np
-import pandas as pd
 import os
-import imblearn
+
+from async_client import PREDICTION_CLIENT, PredictionOverloadedError, PredictionTimeoutError
+from cohort_view import render_cohort_analytics
+from counterfactual import MODIFIABLE_QUESTIONS, counterfactuals, render_counterfactuals
+from dataset_view import render_dataset
+from features import CATEGORICAL_QUESTIONS, ENCODER, NUMERIC_QUESTIONS
+from metrics import METRICS, render_debug_panel, start_run
+from prediction_cache import PREDICTION_CACHE
+from registry import REGISTRY
+from resources import load_mortality_snapshot
+from schema import SCHEMA
 
 # Define the Streamlit app
 def main():
@@ -26,15 +33,20 @@ def main():
     
     st.title(":warning: Child Mortality Risk Prediction")
 
+    # Time each stage of this rerun; kept in the session for the debug panel (?debug=1)
+    run = start_run(st.session_state)
+
     # Determine the directory of the current script
     current_dir = os.path.dirname(__file__)
 
     # Construct the path to the preprocessed_dhs_dummies.csv file
     mortality_csv_path = os.path.join(current_dir, "data", "mortality_data.csv")
 
-    # Load the mortality dataset from CSV
+    # Load the mortality dataset from CSV, cached across reruns and sessions;
+    # rows appended to the file since the last rerun are picked up incrementally
     try:
-        mortality_df = pd.read_csv(mortality_csv_path)
+        with run.stage("load_data"):
+            mortality_snapshot = load_mortality_snapshot(mortality_csv_path)
     except FileNotFoundError:
         st.error(f"The mortality_data.csv file was not found at {mortality_csv_path}. Please make sure it is in the correct directory.")
         return
@@ -42,10 +54,10 @@ def main():
     # Construct the path to the adaboost2.pkl file
     model_path = os.path.join(current_dir, "adaboost2.pkl")
 
-    # Load the model from pickle file
+    # Activate the model in the shared registry; it is only reloaded when the file changes
     try:
-        with open(model_path, "rb") as f:
-            model = pickle.load(f)
+        with run.stage("load_model"):
+            model_info, model = REGISTRY.ensure_active(model_path)
     except FileNotFoundError:
         st.error(f"The adaboost2.pkl file was not found at {model_path}. Please make sure it is in the correct directory.")
         return
@@ -53,57 +65,17 @@ def main():
         st.error(f"An error occurred while loading the model: {e}")
         return
 
+    # Cohort analytics scores the whole dataset instead of a single child
+    if st.sidebar.radio("Mode", ["Individual prediction", "Cohort analytics"]) == "Cohort analytics":
+        with run.stage("cohort_analytics"):
+            render_cohort_analytics(mortality_snapshot.features(), mortality_snapshot.column("b5"), model,
+                                    model_info["sha256"])
+        return
+
     # Display dataset
     st.write("Here is the DHS Program child mortality dataset used for the prediction:")
-    st.write(mortality_df)
-
-    # Extract feature columns from the dataframe
-    feature_columns = ["rural",
-                       "region_mindanao",
-                       "region_visayas",
-                       "householdhead_female",
-                       "wealth_poorer",
-                       "wealth_middle",
-                       "wealth_richer",
-                       "wealth_richest",
-                       "freqtv_lessthanonce",
-                       "freqtv_atleasonce",
-                       "freqradio_lessthanonce",
-                       "freqradio_atleasonce",
-                       "toilet_unimproved",
-                       "toilet_open_defecation",
-                       "toilet_unknown",
-                       "drinkingwater_unimproved",
-                       "drinkingwater_unknown",
-                       "mother_age_20_24",
-                       "mother_age_25_29",
-                       "mother_age_30_34",
-                       "mother_age_35_39",
-                       "mother_age_40_44",
-                       "mother_age_45_49",
-                       "mothereduc_primary",
-                       "mothereduc_secondary",
-                       "mothereduc_higher",
-                       "mother_working",
-                       "total_children_born",
-                       "age_first_birth",
-                       "total_births_last5years",
-                       "contraceptive_folk",
-                       "contraceptive_traditional",
-                       "contraceptive_modern",
-                       "breastfeeding_never",
-                       "breastfeeding_still",
-                       "child_sex_female",
-                       "child_age_months",
-                       "twin_1st",
-                       "twin_2nd",
-                       "preceding_birthinterval_months",
-                       "childsize_larger",
-                       "childsize_average",
-                       "childsize_smaller",
-                       "childsize_verysmall",
-                       "childsize_unknown"]
-    mortality_data = mortality_df[feature_columns].values
+    with run.stage("render_dataset"):
+        render_dataset(summary=mortality_snapshot.summary(), rows=mortality_snapshot.frame)
 
     # User input for new data
     st.header("Check your child's risk to child mortality")
@@ -113,100 +85,35 @@ def main():
     ## Household Information
     st.write("")
     st.subheader(":house: Household Information")
-    
-    rural_mapping = {"Urban Area": 0, "Rural Area": 1}
-    selected_rural = st.selectbox("Where are you located?", ["Urban Area", "Rural Area"], index=1)
-    rural = rural_mapping[selected_rural]
+
+    # Answers are collected per session and encoded by the shared schema-driven encoder
+    answers = {}
+
+    answers["rural"] = st.selectbox("Where are you located?", list(CATEGORICAL_QUESTIONS["rural"]), index=1)
 
     ### Region
-    region_mapping = {
-        "Visayas": "region_visayas",
-        "Mindanao": "region_mindanao",
-        "Modern method": "contraceptive_modern"}
-    # Display select box for selection
-    selected_region = st.selectbox("What region are you residing in?", ["Luzon", "Visayas", "Mindanao"], index=0)
-    # Assign values based on selection
-    for region, element in region_mapping.items():
-        if selected_region == region:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["region"] = st.selectbox("What region are you residing in?", list(CATEGORICAL_QUESTIONS["region"]), index=0)
 
     ### Household Head
-    head_mapping = {"Male": 0, "Female": 1}
-    selected_head = st.selectbox("What is the sex of the household head?", ["Male", "Female"], index=0)
-    householdhead_female = head_mapping[selected_head]
+    answers["householdhead"] = st.selectbox("What is the sex of the household head?", list(CATEGORICAL_QUESTIONS["householdhead"]), index=0)
 
     ### Wealth index
-    wealth_mapping = {
-        "Php10,957-Php43,828": "wealth_poorer",
-        "Php43,828-Php76,669": "wealth_middle",
-        "Php76,669-Php219,140": "wealth_richer",
-        "more than Php219,140": "wealth_richest"}
-    # Display select box for selection
-    selected_wealth = st.selectbox("What is your household's total income?", ["less than Php10,957", "Php10,957-Php43,828", "Php43,828-Php76,669", "Php76,669-Php219,140","more than Php219,140"], index=0)
-    # Assign values based on selection
-    for wealth, element in wealth_mapping.items():
-        if selected_wealth == wealth:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["wealth"] = st.selectbox("What is your household's total income?", list(CATEGORICAL_QUESTIONS["wealth"]), index=0)
 
     ### Frequency TV
-    tv_mapping = {
-        "Less than once a week": "freqtv_lessthanonce",
-        "At least once a week": "freqtv_atleasonce"}
-    # Display select box for selection
-    selected_tv = st.selectbox("How frequent do you watch TV?", ["I don't watch TV", "Less than once a week", "At least once a week"], index=1)
-    # Assign values based on selection
-    for tv, element in tv_mapping.items():
-        if selected_tv == tv:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["tv"] = st.selectbox("How frequent do you watch TV?", list(CATEGORICAL_QUESTIONS["tv"]), index=1)
     
     ### Frequency Radio
-    rad_mapping = {
-        "Less than once a week": "freqradio_lessthanonce",
-        "At least once a week": "freqradio_atleasonce"}
-    # Display select box for selection
-    selected_rad = st.selectbox("How frequent do you listen to radio?", ["I don't listen to radio", "Less than once a week", "At least once a week"], index=1)
-    # Assign values based on selection
-    for rad, element in rad_mapping.items():
-        if selected_rad == rad:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["radio"] = st.selectbox("How frequent do you listen to radio?", list(CATEGORICAL_QUESTIONS["radio"]), index=1)
 
     ### Toilet Facility
-    toilet_mapping = {
-        "Unimproved Toilet Facility": "toilet_unimproved",
-        "Open Defecation": "toilet_open_defecation",
-        "I don't know": "toilet_unknown"}
-    # Display select box for selection
-    selected_toilet = st.selectbox("What kind of toilet do you use?", ["Improved Toilet Facility", "Unimproved Toilet Facility", "Open Defecation", "I don't know"], index=0)
-    # Assign values based on selection
-    for toilet, element in toilet_mapping.items():
-        if selected_toilet == toilet:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["toilet"] = st.selectbox("What kind of toilet do you use?", list(CATEGORICAL_QUESTIONS["toilet"]), index=0)
     st.markdown("*-- Improved Toilet Facility - flush/pour flush toilet connected to piped sewer/septic tank/pit latrine, pit latrine with slab, composting toilet*")
     st.markdown("*-- Unimproved Toilet Facility - flush/pour flush toilet NOT connected to piped sewer/septic tank/pit latrine, open pit, bucket, hanging toilet/latrine*")
     st.markdown("*-- Open Defecation - no facility/toilet, bush, field*")
 
     ### Drinking Water
-    water_mapping = {
-        "Unimproved Drinking Water Source": "drinkingwater_unimproved",
-        "I don't know": "drinkingwater_unknown"}
-    # Display select box for selection
-    selected_water = st.selectbox("Where do you get your drinking water?", ["Improved Drinking Water Source", "Unimproved Drinking Water Source", "I don't know"], index=0)
-    # Assign values based on selection
-    for water, element in water_mapping.items():
-        if selected_water == water:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["water"] = st.selectbox("Where do you get your drinking water?", list(CATEGORICAL_QUESTIONS["water"]), index=0)
     st.markdown("*-- Improved Drinking Water Source - piped, tube well, borehole, protected dug well/spring, rainwater, tanker truck, bottled water, water refilling station*")
     st.markdown("*-- Unimproved Drinking Water Source - unprotected dug well/spring, surface water*")
 
@@ -218,79 +125,31 @@ def main():
     st.subheader(":woman_standing: Mother's Information")
 
     ### Mother's age
-    mage_mapping = {
-        "20-24": "mother_age_20_24",
-        "25-29": "mother_age_25_29",
-        "30-34": "mother_age_30_34",
-        "35-39": "mother_age_35_39",
-        "40-44": "mother_age_40_44",
-        "45-49": "mother_age_45_49"}
-    # Display select box for selection
-    selected_mage = st.selectbox("What is the mother's age in years?", ["less than 20","20-24", "25-29", "30-34", "35-39","40-44","45-49","more than 49"], index=1)
-    # Assign values based on selection
-    for mage, element in mage_mapping.items():
-        if selected_mage == mage:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["mother_age"] = st.selectbox("What is the mother's age in years?", list(CATEGORICAL_QUESTIONS["mother_age"]), index=1)
 
     ### Mother's Education
-    educ_mapping = {
-        "Elementary": "mothereduc_primary",
-        "Highschool": "mothereduc_secondary",
-        "College or Higher": "mothereduc_higher"}
-    # Display select box for selection
-    selected_educ = st.selectbox("What is the mother's highest educational attainment?", ["None", "Elementary", "Highschool", "College or Higher"], index=0)
-    # Assign values based on selection
-    for educ, element in educ_mapping.items():
-        if selected_educ == educ:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["mother_educ"] = st.selectbox("What is the mother's highest educational attainment?", list(CATEGORICAL_QUESTIONS["mother_educ"]), index=0)
         
     # Working
-    work_mapping = {"No": 0, "Yes": 1}
-    selected_work = st.selectbox("Are you currently employed?", ["No", "Yes"], index=0)
-    mother_working = work_mapping[selected_work]
+    answers["mother_working"] = st.selectbox("Are you currently employed?", list(CATEGORICAL_QUESTIONS["mother_working"]), index=0)
 
     # Total Children Born
-    total_children_born = st.number_input("How many children have you given birth to?", min_value=1, max_value=50, value=1, step=1)
+    answers["total_children_born"] = st.number_input("How many children have you given birth to?", **NUMERIC_QUESTIONS["total_children_born"], value=1, step=1)
 
     # Age at first birth
-    age_first_birth = st.number_input("At what age did you have your first child?", min_value=1, max_value=50, value=18, step=1)
+    answers["age_first_birth"] = st.number_input("At what age did you have your first child?", **NUMERIC_QUESTIONS["age_first_birth"], value=18, step=1)
 
     # Total births in 5 years
-    total_births_last5years = st.number_input("How many times have you given birth in the last 5 years?", min_value=1, max_value=10, value=1, step=1)
+    answers["total_births_last5years"] = st.number_input("How many times have you given birth in the last 5 years?", **NUMERIC_QUESTIONS["total_births_last5years"], value=1, step=1)
 
     ### Contraceptive
-    contra_mapping = {
-        "Folkloric method": "contraceptive_folk",
-        "Traditional method": "contraceptive_traditional",
-        "Modern method": "contraceptive_modern"}
-    # Display select box for selection
-    selected_contra = st.selectbox("What kind of contraceptive method do you or your partner use?", ["None", "Folkloric method", "Traditional method", "Modern method"], index=0)
-    # Assign values based on selection
-    for contra, element in contra_mapping.items():
-        if selected_contra == contra:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["contraceptive"] = st.selectbox("What kind of contraceptive method do you or your partner use?", list(CATEGORICAL_QUESTIONS["contraceptive"]), index=0)
     st.markdown("*-- Folkloric method - includes abdominal massage, amulet, bato-balani, asugi, mixtures, laxatives, salt, herbs and spiritual/cultural practices*")
     st.markdown("*-- Traditional method - includes abstinence, rhythmic or calendar method and withdrawal*")
     st.markdown("*-- Modern method - includes pill, IUD, injection, implants, female/male sterilization, male/female condom, LAM, and emergency contraception*")
     
     ### Breastfeeding
-    breastfeed_mapping = {
-        "Never": "breastfeeding_never",
-        "Yes, up to now": "breastfeeding_still"}
-    # Display select box for selection
-    selected_breastfeed = st.selectbox("Have you ever breastfed your child?", ["Never", "Yes, before", "Yes, up to now"], index=0)
-    # Assign values based on selection
-    for breastfeed, element in breastfeed_mapping.items():
-        if selected_breastfeed == breastfeed:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["breastfeeding"] = st.selectbox("Have you ever breastfed your child?", list(CATEGORICAL_QUESTIONS["breastfeeding"]), index=0)
 
 
 
@@ -301,111 +160,63 @@ def main():
     st.subheader(":baby: Child's Information")
 
     # Child sex
-    sex_mapping = {"Male": 0, "Female": 1}
-    selected_sex = st.selectbox("What is the child's sex?", ["Male", "Female"], index=0)
-    child_sex_female = sex_mapping[selected_sex]
+    answers["child_sex"] = st.selectbox("What is the child's sex?", list(CATEGORICAL_QUESTIONS["child_sex"]), index=0)
 
     # Child age in months
-    child_age_months = st.number_input("How old is your child in months?", min_value=0, max_value=60, value=1, step=1)
+    answers["child_age_months"] = st.number_input("How old is your child in months?", **NUMERIC_QUESTIONS["child_age_months"], value=1, step=1)
 
     # Twin Birth
-    twin_mapping = {
-        "Yes, 1st born": "twin_1st",
-        "Yes, last born": "twin_2nd"}
-    # Display select box for child size selection
-    selected_twin = st.selectbox("Is this child a twin, or part of a multiple birth?", ["No", "Yes, 1st born", "Yes, last born"], index=0)
-    # Assign values based on selected child size
-    for twin, element in twin_mapping.items():
-        if selected_twin == twin:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["twin"] = st.selectbox("Is this child a twin, or part of a multiple birth?", list(CATEGORICAL_QUESTIONS["twin"]), index=0)
     
     # Preceding birth
-    preceeding_birthinterval_months = st.number_input("How many months apart are your current child and your previous child?", min_value=0, max_value=500, value=12, step=1)
+    answers["preceding_birthinterval_months"] = st.number_input("How many months apart are your current child and your previous child?", **NUMERIC_QUESTIONS["preceding_birthinterval_months"], value=12, step=1)
 
     ### Child size
-    childsize_mapping = {
-        "Larger": "childsize_larger",
-        "Average": "childsize_average",
-        "Smaller": "childsize_smaller",
-        "Very Small": "childsize_verysmall",
-        "Unknown": "childsize_unknown"}
-    # Display select box for child size selection
-    selected_childsize = st.selectbox("What is the child's size during birth?", ["Larger", "Average", "Smaller", "Very Small", "Unknown"], index=1)
-    # Assign values based on selected child size
-    for size, element in childsize_mapping.items():
-        if selected_childsize == size:
-            globals()[element] = 1
-        else:
-            globals()[element] = 0
+    answers["child_size"] = st.selectbox("What is the child's size during birth?", list(CATEGORICAL_QUESTIONS["child_size"]), index=1)
 
     # Prepare new input for prediction
-    new_data = np.array([[rural,
-                          region_mindanao,
-                          region_visayas,
-                          householdhead_female,
-                          wealth_poorer,
-                          wealth_middle,
-                          wealth_richer,
-                          wealth_richest,
-                          freqtv_lessthanonce,
-                          freqtv_atleasonce,
-                          freqradio_lessthanonce,
-                          freqradio_atleasonce,
-                          toilet_unimproved,
-                          toilet_open_defecation,
-                          toilet_unknown,
-                          drinkingwater_unimproved,
-                          drinkingwater_unknown,
-                          mother_age_20_24,
-                          mother_age_25_29,
-                          mother_age_30_34,
-                          mother_age_35_39,
-                          mother_age_40_44,
-                          mother_age_45_49,
-                          mothereduc_primary,
-                          mothereduc_secondary,
-                          mothereduc_higher,
-                          mother_working,
-                          total_children_born,
-                          age_first_birth,
-                          total_births_last5years,
-                          contraceptive_folk,
-                          contraceptive_traditional,
-                          contraceptive_modern,
-                          breastfeeding_never,
-                          breastfeeding_still,
-                          child_sex_female,
-                          child_age_months,
-                          twin_1st,
-                          twin_2nd,
-                          preceeding_birthinterval_months,
-                          childsize_larger,
-                          childsize_average,
-                          childsize_smaller,
-                          childsize_verysmall,
-                          childsize_unknown]])
-
-    # Batch process - combine dataset with new input
-    full_data = np.vstack([mortality_data, new_data])
-    
+    with run.stage("encode"):
+        new_data = ENCODER.encode(answers)
+        answer_errors = SCHEMA.validate(new_data[None]).row_errors(0)
+
+    # Combinations the widgets cannot rule out on their own, e.g. more births
+    # in the last five years than children born in total
+    if answer_errors:
+        st.warning(f"Please check your answers: {'; '.join(answer_errors).replace('_', ' ')}")
+
     # Predict the outcome
     st.write("")
     st.write("")
     if st.button("Predict child mortality risk"):
         try:
-            predictions = model.predict(full_data)
-            new_prediction = predictions[-1]
+            # Score only the new input, reusing the label of a previously seen profile.
+            # Misses run on the shared bounded executor, not on this script thread.
+            with run.stage("predict"):
+                new_prediction = PREDICTION_CACHE.predict(model, new_data, model_info["sha256"], predictor=PREDICTION_CLIENT.predict_sync)
+            METRICS.inc("predictions_total")
             risk_status = "at risk" if new_prediction == 1 else "not at risk"
             
             color = "red"
 
             result_text = f"<h2>Your child is <i><span style='color:{color};'>{risk_status}</span></i> of child mortality.</h2>"
             st.markdown(result_text, unsafe_allow_html=True)
+
+            # Answer changes that would flip the prediction, all scored in one batch on the shared executor
+            with run.stage("counterfactuals"):
+                what_if = PREDICTION_CLIENT.run_sync(counterfactuals, model, answers, MODIFIABLE_QUESTIONS,
+                                                     fingerprint=model_info["sha256"])
+            render_counterfactuals(what_if)
         
+        except PredictionOverloadedError as e:
+            st.warning(str(e))
+        except PredictionTimeoutError as e:
+            st.error(str(e))
         except Exception as e:
+            METRICS.inc("prediction_errors_total")
             st.error(f"An error occurred during prediction: {e}")
 
+    if st.query_params.get("debug"):
+        render_debug_panel(st.session_state)
+
 if __name__ == "__main__":
     main()
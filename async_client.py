@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+from scoring import predict_one
+
+
+class PredictionOverloadedError(RuntimeError):
+    pass
+
+
+class PredictionTimeoutError(TimeoutError):
+    pass
+
+
+# asyncio front end for model inference on a bounded thread pool.
+# Inference never runs on the caller's thread, so a slow batch or a model
+# reload only occupies pool workers. At most max_pending calls may be queued
+# or running; beyond that predict() fails fast with PredictionOverloadedError
+# instead of piling up work. A slot is released when the model call actually
+# finishes, so a timed-out or cancelled caller does not hide a stuck worker.
+class AsyncPredictionClient:
+    def __init__(self, max_workers=2, max_pending=8, timeout=10.0):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prediction")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PredictionOverloadedError(
+                    f"Prediction service is busy ({self.pending} requests in flight), please try again")
+            self.pending += 1
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    async def run(self, func, *args, timeout=None, **kwargs):
+        self._acquire()
+        try:
+            job = self._executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        job.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            job.cancel()
+            raise PredictionTimeoutError(f"Prediction did not finish within {timeout or self.timeout}s") from None
+
+    async def predict(self, model, row, timeout=None):
+        return await self.run(predict_one, model, row, timeout=timeout)
+
+    async def predict_many(self, model, X, timeout=None):
+        return await self.run(model.predict, X, timeout=timeout)
+
+    # For synchronous callers such as the Streamlit script thread
+    def predict_sync(self, model, row, timeout=None):
+        return asyncio.run(self.predict(model, row, timeout=timeout))
+
+    # Any other model work (counterfactual sweeps, cohort scoring) from a synchronous caller
+    def run_sync(self, func, *args, timeout=None, **kwargs):
+        return asyncio.run(self.run(func, *args, timeout=timeout, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared by every session in the process
+PREDICTION_CLIENT = AsyncPredictionClient()
+METRICS.add_collector("prediction_client", PREDICTION_CLIENT.stats)
+
+# Whole-dataset cohort scoring gets its own worker, so a large extract never
+# holds up the predict button; callers pass a timeout sized to the extract
+COHORT_CLIENT = AsyncPredictionClient(max_workers=1, max_pending=2, timeout=30.0)
+METRICS.add_collector("cohort_client", COHORT_CLIENT.stats)
@@ -0,0 +1,172 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from columnar import is_fresh, load_columns
+from features import FEATURE_COLUMNS
+from parallel import ParallelScorer
+from resources import load_model
+from schema import SCHEMA
+
+
+# Read a CSV or Parquet extract in bounded-size chunks of DataFrames, using the
+# columnar copy of a CSV when there is an up-to-date one
+def iter_chunks(path, chunksize):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif is_fresh(path):
+        # Slices of the memory-mapped columnar copy, see columnar.py
+        columns = load_columns(path)
+        n_rows = len(next(iter(columns.values())))
+        for start in range(0, n_rows, chunksize):
+            yield pd.DataFrame({name: values[start:start + chunksize] for name, values in columns.items()}, copy=False)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+# Writes scored chunks incrementally so the output never sits fully in memory
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self._parquet_writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+# Labels and, when the model has predict_proba, probabilities; from a single
+# pass over the ensemble when the model offers predict_with_proba
+def _predict(model, X):
+    if hasattr(model, "predict_with_proba"):
+        return model.predict_with_proba(X)
+    return model.predict(X), model.predict_proba(X) if hasattr(model, "predict_proba") else None
+
+
+# Values for every row of the chunk, missing (NA) on the rows that were not scored
+def _scatter(values, valid):
+    values = np.asarray(values)
+    dtype = "Int64" if values.dtype.kind in "iub" else "Float64" if values.dtype.kind == "f" else object
+    column = pd.Series(pd.NA, index=range(len(valid)), dtype=dtype)
+    column[valid] = values
+    return column
+
+
+# Score one chunk: index column, predicted label, probability of being at
+# risk, and the schema rules the row breaks (empty for valid rows; see schema.py).
+# Values that are not numbers become NaN; rows breaking a rule are not scored
+# and get a missing prediction and probability next to their errors.
+def score_chunk(model, chunk, index_col=None, row_offset=0):
+    missing = [column for column in FEATURE_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing feature columns: {missing}")
+
+    features = chunk[FEATURE_COLUMNS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    validation = SCHEMA.validate(features)
+    valid = validation.valid
+    scored = pd.DataFrame()
+    if index_col is not None:
+        scored[index_col] = chunk[index_col].to_numpy()
+    else:
+        scored["row"] = np.arange(row_offset, row_offset + len(chunk))
+
+    labels, proba = _predict(model, features[valid]) if valid.any() else (np.empty(0, dtype=np.int64), None)
+    scored["prediction"] = _scatter(labels, valid)
+    if hasattr(model, "predict_proba"):
+        if proba is None:
+            proba = np.empty((0, len(model.classes_)))
+        classes = list(model.classes_)
+        scored["probability"] = _scatter(proba[:, classes.index(1)] if 1 in classes else proba.max(axis=1), valid)
+    errors = np.full(len(chunk), "", dtype=object)
+    for i, rules in validation.invalid_rows().items():
+        errors[i] = "; ".join(rules)
+    scored["errors"] = errors
+    return scored
+
+
+# Stream an extract through the model and write the scores, returns run stats
+def score_file(model, input_path, output_path, chunksize=50_000, index_col=None):
+    writer = ChunkWriter(output_path)
+    n_rows = 0
+    n_invalid = 0
+    n_chunks = 0
+    start = time.perf_counter()
+    try:
+        for chunk in iter_chunks(input_path, chunksize):
+            if n_chunks == 0 and index_col is None and chunk.columns[0] not in FEATURE_COLUMNS + ["b5"]:
+                # Default to the extract's own leading index column, e.g. "Unnamed: 0"
+                index_col = chunk.columns[0]
+            scored = score_chunk(model, chunk, index_col=index_col, row_offset=n_rows)
+            writer.write(scored)
+            n_invalid += int((scored["errors"] != "").sum())
+            n_rows += len(chunk)
+            n_chunks += 1
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": n_rows,
+        "invalid_rows": n_invalid,
+        "chunks": n_chunks,
+        "seconds": elapsed,
+        "rows_per_second": n_rows / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+def main(argv=None):
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet survey extract with the child mortality model.")
+    parser.add_argument("input", help="CSV or .parquet file with the model's feature columns")
+    parser.add_argument("output", help="CSV or .parquet file to write the scores to")
+    parser.add_argument("--model", default=os.path.join(current_dir, "adaboost2.pkl"))
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows read and scored at a time")
+    parser.add_argument("--index-col", default=None, help="column copied next to the scores (default: the input's leading index column)")
+    parser.add_argument("--workers", type=int, default=1, help="score each chunk across this many processes")
+    parser.add_argument("--shard-size", type=int, default=10_000, help="rows per worker task when --workers > 1")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.workers > 1:
+            model = ParallelScorer(args.model, n_workers=args.workers, shard_size=args.shard_size)
+        else:
+            model = load_model(args.model)
+    except FileNotFoundError:
+        parser.error(f"The model file was not found at {args.model}.")
+
+    try:
+        stats = score_file(model, args.input, args.output, chunksize=args.chunksize, index_col=args.index_col)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if isinstance(model, ParallelScorer):
+            model.close()
+
+    print(f"Scored {stats['rows']} rows in {stats['chunks']} chunks in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s), {stats['invalid_rows']} rows break the schema", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
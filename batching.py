@@ -0,0 +1,106 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# Coalesces concurrent single-row predictions into small batches.
+# The first request to arrive opens a batch; the batch is scored with one
+# model.predict call as soon as it holds max_batch rows or max_wait seconds
+# have passed since it opened, and each caller gets its own row's label back.
+class MicroBatcher:
+    def __init__(self, model, max_batch=64, max_wait=0.002, history=10_000):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._waits = deque(maxlen=history)
+        self.max_queue_depth = 0
+        self.batches = 0
+        self.requests = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    # Queue one encoded row, returns a Future resolving to its label
+    def submit(self, row):
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((np.asarray(row, dtype=np.float64).ravel(), future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout)
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Score what we have, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            rows, futures, submitted = zip(*batch)
+            try:
+                labels = self.model.predict(np.vstack(rows))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, label in zip(futures, labels):
+                    future.set_result(label)
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._waits.extend(started - t for t in submitted)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            waits = np.array(self._waits)
+            stats = {
+                "requests": self.requests,
+                "batches": self.batches,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            }
+        if len(waits):
+            p50, p99 = np.percentile(waits, [50, 99]) * 1e3
+            stats.update({"wait_p50_ms": p50, "wait_p99_ms": p99, "wait_max_ms": waits.max() * 1e3})
+        return stats
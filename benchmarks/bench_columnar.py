@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from columnar import columnar_dir, convert_csv, is_fresh  # noqa: E402
+
+# Runs in a fresh interpreter so every load is cold (nothing cached in-process).
+# numpy/pandas are imported before the baseline so only the dataset is measured.
+_PROBE = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+import numpy as np
+import pandas as pd
+import columnar
+from features import FEATURE_COLUMNS
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+before = rss_kib()
+start = time.perf_counter()
+df = pd.read_csv({csv!r}) if {mode!r} == "csv" else pd.DataFrame(columnar.load_columns({csv!r}), copy=False)
+load_seconds = time.perf_counter() - start
+after_load = rss_kib()
+start = time.perf_counter()
+X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+matrix_seconds = time.perf_counter() - start
+print(json.dumps({{"load_seconds": load_seconds, "matrix_seconds": matrix_seconds,
+                  "rss_after_load_kib": after_load - before, "rss_after_matrix_kib": rss_kib() - before}}))
+"""
+
+
+def probe(csv_path, mode):
+    code = _PROBE.format(root=ROOT, csv=csv_path, mode=mode)
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+# Cold-load time and resident memory of the CSV vs the memory-mapped columnar copy
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cold loads of mortality_data.csv and its columnar copy.")
+    parser.add_argument("--data", default=os.path.join(ROOT, "data", "mortality_data.csv"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not is_fresh(args.data):
+        convert_csv(args.data)
+        print(f"converted {args.data} -> {columnar_dir(args.data)}")
+
+    for mode in ("csv", "columnar"):
+        runs = [probe(args.data, mode) for _ in range(args.repeat)]
+        best = {key: min(run[key] for run in runs) for key in runs[0]}
+        print(f"{mode:>8}: load {best['load_seconds'] * 1e3:7.2f}ms, "
+              f"to float matrix {best['matrix_seconds'] * 1e3:6.2f}ms, "
+              f"RSS +{best['rss_after_load_kib']:,} KiB after load, +{best['rss_after_matrix_kib']:,} KiB with matrix")
+
+
+if __name__ == "__main__":
+    main()
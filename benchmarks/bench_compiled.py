@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from columnar import read_dataset  # noqa: E402
+from compiled import compile_model  # noqa: E402
+from features import FEATURE_COLUMNS  # noqa: E402
+from resources import load_model  # noqa: E402
+
+
+def _timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+# Compare the compiled evaluator with model.predict: exactness, single-row latency, batch throughput
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the compiled AdaBoost evaluator against model.predict.")
+    parser.add_argument("--model", default=os.path.join(ROOT, "adaboost2.pkl"))
+    parser.add_argument("--data", default=os.path.join(ROOT, "data", "mortality_data.csv"))
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    model = load_model(args.model)
+    X = read_dataset(args.data)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+    start = time.perf_counter()
+    compiled = compile_model(model)
+    print(f"compiled {compiled.n_estimators} estimators in {time.perf_counter() - start:.3f}s")
+
+    ada = model.steps[-1][1] if hasattr(model, "steps") else model
+    assert np.array_equal(ada.decision_function(X), compiled.decision_function(X)), "decision scores differ"
+    assert np.array_equal(model.predict(X), compiled.predict(X)), "labels differ"
+    print(f"labels and decision scores are bit-identical on {len(X)} rows")
+
+    row = X[:1]
+    single_sklearn = _timed(lambda: model.predict(row), args.repeat)
+    single_compiled = _timed(lambda: compiled.predict(row), args.repeat)
+    print(f"single row: model.predict {single_sklearn * 1e3:.3f}ms, compiled {single_compiled * 1e3:.3f}ms "
+          f"({single_sklearn / single_compiled:.1f}x)")
+
+    batch_sklearn = _timed(lambda: model.predict(X), 3)
+    batch_compiled = _timed(lambda: compiled.predict(X), 3)
+    print(f"batch of {len(X)}: model.predict {len(X) / batch_sklearn:,.0f} rows/s, "
+          f"compiled {len(X) / batch_compiled:,.0f} rows/s ({batch_sklearn / batch_compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import glob
+import json
+import os
+import pickle
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from columnar import convert_csv, read_dataset  # noqa: E402
+from dataset_view import render_dataset  # noqa: E402
+from features import ENCODER, FEATURE_COLUMNS, random_answers  # noqa: E402
+from scoring import predict_one  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times = np.array(times) * 1e3
+    return {"median_ms": float(np.median(times)), "min_ms": float(times.min()), "max_ms": float(times.max()), "runs": repeat}
+
+
+# Synthetic dataset `scale` times the size of the real one, made of real rows
+# drawn with replacement (keeps one-hot groups and value ranges valid)
+def write_scaled_csv(df, scale, directory, random_state=0):
+    path = os.path.join(directory, f"mortality_data_x{scale}.csv")
+    if scale == 1:
+        scaled = df
+    else:
+        rng = np.random.default_rng(random_state)
+        scaled = df.iloc[rng.integers(0, len(df), size=len(df) * scale)].reset_index(drop=True)
+        scaled["Unnamed: 0"] = np.arange(len(scaled))
+    scaled.to_csv(path, index=False)
+    return path
+
+
+# Phases of main() that don't depend on the dataset size
+def bench_model_phases(model, model_bytes, repeat, rng):
+    results = {}
+    results["unpickle_model"] = measure(lambda: pickle.loads(model_bytes), repeat)
+    answers = [random_answers(rng) for _ in range(100)]
+    results["encode_form_x100"] = measure(lambda: [ENCODER.encode(a) for a in answers], repeat)
+    new_row = ENCODER.encode(answers[0])
+    results["predict_one"] = measure(lambda: predict_one(model, new_row), repeat)
+    return results
+
+
+# Phases of main() on one dataset size, run headlessly (Streamlit bare mode)
+def bench_data_phases(csv_path, model, repeat, rng):
+    results = {}
+    results["read_csv"] = measure(lambda: pd.read_csv(csv_path), repeat)
+    convert_csv(csv_path)
+    results["read_columnar"] = measure(lambda: read_dataset(csv_path), repeat)
+    df = pd.read_csv(csv_path)
+    X = df[FEATURE_COLUMNS].to_numpy()
+
+    new_row = ENCODER.encode(random_answers(rng))
+    # The original main() stacked the new row under the whole dataset and scored all of it
+    results["vstack"] = measure(lambda: np.vstack([X, new_row]), repeat)
+    results["predict_dataset"] = measure(lambda: model.predict(X), repeat)
+    results["render_full_dataset"] = measure(lambda: st.write(df), repeat)
+    results["render_paginated"] = measure(lambda: render_dataset(df), repeat)
+    return results
+
+
+# Full script runs of an app through Streamlit's AppTest harness: the first run
+# and the rerun triggered by clicking the predict button
+def bench_apptest(script, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    state = {}
+
+    def first_run():
+        state["app"] = AppTest.from_file(script, default_timeout=300).run()
+
+    def rerun():
+        state["app"].button[0].click().run()
+
+    results = {"first_run": measure(first_run, 1)}
+    results["warm_run"] = measure(first_run, repeat)
+    errors = [e.value for e in state["app"].error] + [str(e.value) for e in state["app"].exception]
+    results["predict_rerun"] = measure(rerun, repeat) if state["app"].button else None
+    return results, errors
+
+
+def latest_result(directory, exclude=None):
+    paths = sorted(p for p in glob.glob(os.path.join(directory, "main-*.json")) if p != exclude)
+    return paths[-1] if paths else None
+
+
+# Phases whose median got slower than the baseline by more than tolerance
+# (ignoring differences under min_ms, too small to tell apart from noise)
+def find_regressions(current, baseline, tolerance=0.2, min_ms=0.5):
+    regressions = []
+    for name, result in current["phases"].items():
+        before = baseline["phases"].get(name)
+        if not result or not before:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        if ratio > 1 + tolerance and result["median_ms"] - before["median_ms"] > min_ms:
+            regressions.append({"phase": name, "before_ms": before["median_ms"], "after_ms": result["median_ms"], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each phase of the app's main() on real and scaled-up data.")
+    parser.add_argument("--data", default=os.path.join(ROOT, "data", "mortality_data.csv"))
+    parser.add_argument("--model", default=os.path.join(ROOT, "adaboost2.pkl"))
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--apps", nargs="*", default=[os.path.join(ROOT, "app.py")], help="scripts to run through AppTest")
+    parser.add_argument("--output", default=None, help="results JSON (default: benchmarks/results/main-<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="results JSON to compare with (default: the previous run)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="flag phases more than this fraction slower")
+    args = parser.parse_args(argv)
+
+    with open(args.model, "rb") as f:
+        model_bytes = f.read()
+    model = pickle.loads(model_bytes)
+    df = pd.read_csv(args.data)
+    rng = np.random.default_rng(0)
+
+    current = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                        "streamlit": st.__version__, "machine": platform.machine(), "cpus": os.cpu_count()},
+        "model": os.path.basename(args.model),
+        "rows": {},
+        "phases": {},
+        "errors": {},
+    }
+    for name, result in bench_model_phases(model, model_bytes, args.repeat, rng).items():
+        current["phases"][f"model/{name}"] = result
+        print(f"model {name:<22} median {result['median_ms']:10.2f}ms  min {result['min_ms']:10.2f}ms")
+
+    workdir = tempfile.mkdtemp(prefix="bench_main_")
+    try:
+        for scale in args.scales:
+            csv_path = write_scaled_csv(df, scale, workdir)
+            current["rows"][f"x{scale}"] = len(df) * scale
+            for name, result in bench_data_phases(csv_path, model, args.repeat, rng).items():
+                current["phases"][f"x{scale}/{name}"] = result
+                print(f"x{scale:<4} {name:<22} median {result['median_ms']:10.2f}ms  min {result['min_ms']:10.2f}ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for script in args.apps:
+        app = os.path.splitext(os.path.basename(script))[0]
+        results, errors = bench_apptest(os.path.abspath(script), args.repeat)
+        if errors:
+            current["errors"][app] = errors
+        for name, result in results.items():
+            current["phases"][f"apptest/{app}/{name}"] = result
+            if result:
+                print(f"{app:<5} {name:<22} median {result['median_ms']:10.2f}ms  min {result['min_ms']:10.2f}ms")
+        for error in errors:
+            print(f"{app}: the app reported an error: {error}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"main-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    baseline_path = args.baseline or latest_result(RESULTS_DIR, exclude=os.path.abspath(output))
+    with open(output, "w") as f:
+        json.dump(current, f, indent=1)
+    print(f"\nResults written to {output}")
+
+    if baseline_path is None:
+        print("No baseline to compare with")
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(current, baseline, args.tolerance)
+    print(f"Compared with {baseline_path}: {len(regressions)} regression(s)")
+    for r in regressions:
+        print(f"  REGRESSION {r['phase']}: {r['before_ms']:.2f}ms -> {r['after_ms']:.2f}ms ({r['ratio']:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fresh interpreter per run: time from nothing imported to the first prediction
+_PROBE = """
+import time
+start = time.perf_counter()
+import json, sys
+sys.path.insert(0, {root!r})
+import numpy as np
+if {mode!r} == "pickle":
+    import pickle
+    with open({path!r}, "rb") as f:
+        model = pickle.load(f)
+else:
+    from compiled import CompiledEnsemble
+    model = CompiledEnsemble.load({path!r})
+label = model.predict(np.zeros((1, 45)))[0]
+seconds = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+print(json.dumps({{"seconds": seconds, "rss_kib": rss, "sklearn": "sklearn" in sys.modules, "imblearn": "imblearn" in sys.modules}}))
+"""
+
+
+def probe(mode, path):
+    code = _PROBE.format(root=ROOT, mode=mode, path=path)
+    return json.loads(subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout)
+
+
+# Cold start (imports + load + first prediction) and RSS: pickle vs NumPy export
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cold start of the pickled model and its NumPy export.")
+    parser.add_argument("--model", default=os.path.join(ROOT, "adaboost2.pkl"))
+    parser.add_argument("--export", default=None, help="export directory (default: <model>.arrays, created if missing)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    export = args.export or os.path.splitext(args.model)[0] + ".arrays"
+    if not os.path.isdir(export):
+        subprocess.run([sys.executable, os.path.join(ROOT, "compiled.py"), args.model, export], check=True)
+
+    for mode, path in (("pickle", args.model), ("export", export)):
+        runs = [probe(mode, path) for _ in range(args.repeat)]
+        seconds = sorted(run["seconds"] for run in runs)[len(runs) // 2]
+        rss = sorted(run["rss_kib"] for run in runs)[len(runs) // 2]
+        print(f"{mode:>7}: first prediction after {seconds * 1e3:7.1f}ms, RSS {rss / 1024:6.1f} MiB, "
+              f"sklearn imported: {runs[0]['sklearn']}, imblearn imported: {runs[0]['imblearn']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from columnar import read_dataset  # noqa: E402
+from features import FEATURE_COLUMNS  # noqa: E402
+from parallel import ParallelScorer  # noqa: E402
+from resources import load_model  # noqa: E402
+
+
+# Measure parallel scoring throughput from 1 to N workers on mortality_data.csv
+# replicated --replicate times
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ParallelScorer scaling across worker counts.")
+    parser.add_argument("--model", default=os.path.join(ROOT, "adaboost2.pkl"))
+    parser.add_argument("--data", default=os.path.join(ROOT, "data", "mortality_data.csv"))
+    parser.add_argument("--replicate", type=int, default=20)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    base = read_dataset(args.data)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    X = np.tile(base, (args.replicate, 1))
+    print(f"{len(X)} rows, shard size {args.shard_size}")
+
+    start = time.perf_counter()
+    expected = load_model(args.model).predict(X)
+    baseline = time.perf_counter() - start
+    print(f"in-process predict: {baseline:.2f}s ({len(X) / baseline:,.0f} rows/s)")
+
+    workers = 1
+    while workers <= args.max_workers:
+        with ParallelScorer(args.model, n_workers=workers, shard_size=args.shard_size) as scorer:
+            # Warm the pool so worker start-up and model loading are not timed
+            scorer.predict(X[:workers * args.shard_size])
+            start = time.perf_counter()
+            labels = scorer.predict(X)
+            elapsed = time.perf_counter() - start
+        assert np.array_equal(labels, expected), "parallel labels differ from in-process predict"
+        print(f"{workers:>3} workers: {elapsed:.2f}s ({len(X) / elapsed:,.0f} rows/s, {baseline / elapsed:.2f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batching import MicroBatcher  # noqa: E402
+from features import random_answers  # noqa: E402
+from service import PredictionServer, load_predictor  # noqa: E402
+
+
+# One keep-alive connection sending requests back to back until the deadline
+def _client(port, deadline, seed, latencies, failures):
+    rng = np.random.default_rng(seed)
+    bodies = [json.dumps(random_answers(rng)) for _ in range(256)]
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        conn.request("POST", "/predict", body=bodies[i % len(bodies)], headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            failures.append(response.status)
+        i += 1
+    conn.close()
+
+
+# Start the service in-process on a free port and drive it with concurrent clients
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local load generator for the prediction service.")
+    parser.add_argument("--model", default=os.path.join(ROOT, "adaboost2.pkl"))
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch-window-ms", type=float, default=0.0, help="enable micro-batching with this window")
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    predictor = load_predictor(args.model)
+    batcher = MicroBatcher(predictor, args.max_batch, args.batch_window_ms / 1e3) if args.batch_window_ms > 0 else None
+    server = PredictionServer(("127.0.0.1", 0), predictor, batcher=batcher)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    latencies, failures = [], []
+    deadline = time.perf_counter() + args.seconds
+    clients = [threading.Thread(target=_client, args=(port, deadline, seed, latencies, failures)) for seed in range(args.clients)]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/metrics")
+    metrics = json.loads(conn.getresponse().read())
+    server.shutdown()
+    server.server_close()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.1f}s: {len(latencies) / elapsed:,.0f} req/s, "
+          f"{len(failures)} failures")
+    print(f"client latency p50 {p50:.2f}ms, p99 {p99:.2f}ms")
+    print(f"server latency p50 {metrics['p50_ms']:.2f}ms, p99 {metrics['p99_ms']:.2f}ms")
+    if "batching" in metrics:
+        batching = metrics["batching"]
+        print(f"micro-batching: {batching['batches']} batches, mean size {batching['mean_batch_size']:.1f}, "
+              f"added wait p50 {batching['wait_p50_ms']:.2f}ms, p99 {batching['wait_p99_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from startup import STARTUP_BUDGET_SECONDS, cold_start  # noqa: E402
+
+
+# Median cold start of each app script against the budget; exits 1 when any is over
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the cold start of the app scripts against the startup budget.")
+    parser.add_argument("scripts", nargs="*", default=[os.path.join(ROOT, "app.py"), os.path.join(ROOT, "app1.py")])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_SECONDS * 1e3)
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for script in args.scripts:
+        runs = [cold_start(script) for _ in range(args.runs)]
+        import_ms, run_ms, total_ms = (np.median([r[key] for r in runs]) * 1e3
+                                       for key in ("import_seconds", "first_run_seconds", "total_seconds"))
+        loaded = ", ".join(name for name, present in runs[0]["modules"].items() if present) or "none"
+        verdict = "ok" if total_ms <= args.budget_ms else "OVER BUDGET"
+        print(f"{os.path.basename(script)}: import {import_ms:.0f}ms + first run {run_ms:.0f}ms = {total_ms:.0f}ms "
+              f"(budget {args.budget_ms:.0f}ms) {verdict}; heavy modules loaded: {loaded}")
+        if total_ms > args.budget_ms:
+            over_budget.append(script)
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
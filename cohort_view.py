@@ -0,0 +1,82 @@
+import io
+
+import numpy as np
+import streamlit as st
+
+from async_client import COHORT_CLIENT, PredictionOverloadedError, PredictionTimeoutError
+from cohorts import COHORT_QUESTIONS, COHORTS
+from compact import CompactMatrix
+from features import FEATURE_COLUMNS
+from schema import SCHEMA
+
+COHORT_TITLES = {"region": "Region", "wealth": "Household income", "rural": "Residence"}
+
+# Scoring time allowed per row on top of COHORT_CLIENT's base timeout, well
+# under the throughput of the slowest (uncompiled pipeline) model
+SECONDS_PER_ROW = 1e-3
+
+
+# Population-level view: every row of the dataset (or of an uploaded extract)
+# scored in one pass, cached per dataset and model, broken down by cohort.
+# X is the dataset's feature matrix (a CompactMatrix or an array) and
+# observed its outcomes, if known.
+def render_cohort_analytics(X, observed, model, fingerprint, target="b5"):
+    st.header(":bar_chart: Cohort risk analytics")
+    st.write("Predicted child mortality risk across all children, by region, household income and residence.")
+
+    key = "dataset"
+    upload = st.file_uploader("Score an extract instead (CSV with the same columns as the dataset)", type="csv")
+    if upload is not None:
+        import pandas as pd
+
+        df = pd.read_csv(io.BytesIO(upload.getvalue()))
+        missing = [column for column in FEATURE_COLUMNS if column not in df.columns]
+        if missing:
+            st.error(f"The extract is missing columns: {', '.join(missing)}")
+            return
+        observed = df[target].to_numpy() if target in df.columns else None
+        key = f"upload:{upload.name}"
+        try:
+            X = CompactMatrix.from_frame(df)
+        except (TypeError, ValueError):
+            # Values that cannot be stored compactly (non-numeric ones become
+            # NaN); validation drops their rows
+            X = df[FEATURE_COLUMNS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+
+        # Rows breaking the form's rules (see schema.py) are left out
+        validation = SCHEMA.validate(X)
+        if validation.n_invalid:
+            valid = validation.valid
+            st.warning(f"{validation.n_invalid:,} of {len(X):,} rows break the survey's answer rules and are left out.")
+            with st.expander("Rule violations"):
+                counts = validation.rule_counts()
+                st.dataframe({"Rule": list(counts), "Rows": list(counts.values())})
+            X = X[valid]
+            observed = None if observed is None else observed[valid]
+        if not isinstance(X, CompactMatrix):
+            X = CompactMatrix.from_array(X)
+
+    # Scored on the cohort executor, off this script thread and out of the
+    # way of single predictions
+    try:
+        with st.spinner(f"Scoring {len(X):,} children..."):
+            scores = COHORT_CLIENT.run_sync(COHORTS.scores, key, model, fingerprint, X, observed,
+                                            timeout=COHORT_CLIENT.timeout + len(X) * SECONDS_PER_ROW)
+    except PredictionOverloadedError as e:
+        st.warning(str(e))
+        return
+    except PredictionTimeoutError as e:
+        st.error(str(e))
+        return
+
+    overall = scores.aggregate([])
+    st.metric("Predicted at risk", f"{overall['predicted_risk_rate'].iloc[0]:.1%}",
+              help=f"{overall['predicted_at_risk'].iloc[0]:,} of {overall['children'].iloc[0]:,} children")
+    for question in COHORT_QUESTIONS:
+        st.subheader(COHORT_TITLES[question])
+        table = scores.aggregate([question])
+        st.bar_chart(table["predicted_risk_rate"])
+        st.dataframe(table)
+
+    with st.expander("Region x income x residence"):
+        st.dataframe(scores.aggregate(COHORT_QUESTIONS))
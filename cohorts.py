@@ -0,0 +1,189 @@
+import argparse
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from compact import CompactMatrix
+from features import CATEGORICAL_QUESTIONS, ENCODER
+
+# Questions the program team breaks risk down by
+COHORT_QUESTIONS = ["region", "wealth", "rural"]
+
+# Label the app reports as "at risk"
+RISK_LABEL = 1
+
+
+def _hasher(X):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(X.tobytes())
+    return digest
+
+
+# Risk scores of one dataset under one model, plus risk totals per cohort cell
+# (every region x wealth x rural combination). Scoring is one vectorized
+# predict over all rows. When called again with the same rows followed by new
+# ones (an appended extract), only the new rows are scored and their cell
+# totals are added; anything else (edited rows, another model) scores afresh.
+class CohortScores:
+    def __init__(self, model, fingerprint, questions=COHORT_QUESTIONS):
+        self.model = model
+        self.fingerprint = fingerprint
+        self.questions = list(questions)
+        self._lock = threading.Lock()
+        self._reset()
+        self.full_scores = 0
+        self.incremental_updates = 0
+        self.rows_scored = 0
+        self.score_seconds = 0.0
+
+    def _reset(self):
+        self.n_rows = 0
+        self._digest = None
+        self.labels = None
+        self.proba = None
+        self.cells = None
+
+    # Score new rows in one pass: labels, and the risk probability when the
+    # model has predict_proba. Only these rows are upcast to float64.
+    def _score(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        labels = np.asarray(self.model.predict(X))
+        proba = None
+        if hasattr(self.model, "predict_proba"):
+            classes = list(self.model.classes_)
+            if RISK_LABEL in classes:
+                proba = self.model.predict_proba(X)[:, classes.index(RISK_LABEL)]
+        return labels, proba
+
+    # Totals per cohort cell for a block of scored rows
+    def _cell_totals(self, X, labels, proba, observed):
+        import pandas as pd
+
+        frame = pd.DataFrame({question: ENCODER.decode_codes(X, question) for question in self.questions})
+        frame["children"] = 1
+        frame["predicted_at_risk"] = (labels == RISK_LABEL).astype(np.int64)
+        if proba is not None:
+            frame["risk_probability"] = proba
+        if observed is not None:
+            frame["observed_at_risk"] = (np.asarray(observed) == RISK_LABEL).astype(np.int64)
+        return frame.groupby(self.questions).sum()
+
+    # Bring the scores up to date with X (n_rows x 45 features, an array or a
+    # CompactMatrix, which is kept compact) and the optional observed
+    # outcomes; returns the number of rows scored
+    def update(self, X, observed=None):
+        if not isinstance(X, CompactMatrix):
+            X = np.ascontiguousarray(X, dtype=np.float64)
+        with self._lock:
+            digest = _hasher(X[:self.n_rows]) if len(X) >= self.n_rows else None
+            if digest is None or (self.n_rows and digest.digest() != self._digest):
+                self._reset()
+                digest = _hasher(X[:0])
+            new = X[self.n_rows:]
+            if not len(new):
+                return 0
+
+            start = time.perf_counter()
+            labels, proba = self._score(new)
+            new_observed = None if observed is None else np.asarray(observed)[self.n_rows:]
+            cells = self._cell_totals(new, labels, proba, new_observed)
+            self.score_seconds += time.perf_counter() - start
+
+            if self.n_rows:
+                self.incremental_updates += 1
+                self.labels = np.concatenate([self.labels, labels])
+                self.proba = None if proba is None else np.concatenate([self.proba, proba])
+                self.cells = self.cells.add(cells, fill_value=0)
+            else:
+                self.full_scores += 1
+                self.labels, self.proba, self.cells = labels, proba, cells
+            digest.update(new.tobytes())
+            self._digest = digest.digest()
+            self.n_rows = len(X)
+            self.rows_scored += len(new)
+            return len(new)
+
+    # Risk aggregates grouped by some of the cohort questions ([] for the overall totals)
+    def aggregate(self, by):
+        with self._lock:
+            cells = self.cells
+        if cells is None:
+            raise ValueError("Nothing has been scored yet")
+        totals = cells.groupby(level=by).sum() if by else cells.sum().to_frame("All children").T
+        if by:
+            for question in by:
+                options = list(CATEGORICAL_QUESTIONS[question])
+                totals = totals.rename(index=dict(enumerate(options)), level=question if len(by) > 1 else None)
+        result = totals[["children", "predicted_at_risk"]].astype(np.int64)
+        result["predicted_risk_rate"] = totals["predicted_at_risk"] / totals["children"]
+        if "risk_probability" in totals:
+            result["mean_risk_probability"] = totals["risk_probability"] / totals["children"]
+        if "observed_at_risk" in totals:
+            result["observed_rate"] = totals["observed_at_risk"] / totals["children"]
+        return result
+
+    def stats(self):
+        return {
+            "rows": self.n_rows,
+            "full_scores": self.full_scores,
+            "incremental_updates": self.incremental_updates,
+            "rows_scored": self.rows_scored,
+            "score_seconds": self.score_seconds,
+        }
+
+
+# Scores per (dataset key, model fingerprint), shared by every session. A
+# dataset key is a name for where the rows come from (the bundled CSV, an
+# uploaded file); its scores are dropped when the model fingerprint changes.
+class CohortCache:
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def scores(self, key, model, fingerprint, X, observed=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.fingerprint != fingerprint:
+                entry = self._entries[key] = CohortScores(model, fingerprint)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        entry.update(X, observed)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every session in the process
+COHORTS = CohortCache()
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    from resources import load_model
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Predicted child mortality risk by region, wealth and residence.")
+    parser.add_argument("--data", default=os.path.join(current_dir, "data", "mortality_data.csv"))
+    parser.add_argument("--model", default=os.path.join(current_dir, "adaboost2.pkl"))
+    parser.add_argument("--by", nargs="*", default=None, help="questions to group by together (default: each one separately)")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    model = load_model(args.model)
+    start = time.perf_counter()
+    scores = CohortScores(model, None)
+    scores.update(CompactMatrix.from_frame(df), df["b5"] if "b5" in df else None)
+    print(f"Scored {scores.n_rows:,} rows in {time.perf_counter() - start:.2f}s\n")
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_columns", None)
+    for by in ([args.by] if args.by is not None else [[]] + [[question] for question in COHORT_QUESTIONS]):
+        print(scores.aggregate(by), end="\n\n")
@@ -0,0 +1,122 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+
+MANIFEST = "manifest.json"
+
+
+# Directory holding the columnar copy of a CSV, e.g. data/mortality_data.columns
+def columnar_dir(csv_path):
+    return os.path.splitext(csv_path)[0] + ".columns"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Smallest dtype that holds the column exactly: int8 for 0/1 dummies and small counts
+def compact_dtype(values):
+    if values.dtype.kind in "iub" or (values.dtype.kind == "f" and np.isfinite(values).all() and (values == np.round(values)).all()):
+        low, high = (values.min(), values.max()) if len(values) else (0, 0)
+        for dtype in (np.int8, np.int16, np.int32, np.int64):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+    return values.dtype
+
+
+# Write every CSV column as its own .npy file plus a manifest describing the source
+def convert_csv(csv_path, out_dir=None):
+    import pandas as pd
+
+    out_dir = out_dir or columnar_dir(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+    df = pd.read_csv(csv_path)
+    columns = []
+    for i, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        dtype = compact_dtype(values)
+        filename = f"{i:03d}.npy"
+        np.save(os.path.join(out_dir, filename), values.astype(dtype))
+        columns.append({"name": column, "dtype": dtype.str, "file": filename})
+
+    stat = os.stat(csv_path)
+    manifest = {
+        "source": os.path.basename(csv_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_sha256": _sha256(csv_path),
+        "rows": len(df),
+        "columns": columns,
+    }
+    # Manifest last, so a half-written conversion is never picked up as fresh
+    tmp_path = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST))
+    return out_dir
+
+
+def read_manifest(csv_path):
+    try:
+        with open(os.path.join(columnar_dir(csv_path), MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+# The binary copy is fresh if the CSV is unchanged: same size and mtime, or same content hash
+def is_fresh(csv_path, manifest=None):
+    manifest = manifest or read_manifest(csv_path)
+    if manifest is None:
+        return False
+    try:
+        stat = os.stat(csv_path)
+    except FileNotFoundError:
+        # No CSV to be stale against, the binary copy is the dataset
+        return True
+    if stat.st_size != manifest["source_size"]:
+        return False
+    if stat.st_mtime_ns == manifest["source_mtime_ns"]:
+        return True
+    return _sha256(csv_path) == manifest["source_sha256"]
+
+
+# Memory-map every column read-only, no parsing and no copy
+def load_columns(csv_path, manifest=None):
+    manifest = manifest or read_manifest(csv_path)
+    out_dir = columnar_dir(csv_path)
+    return {c["name"]: np.load(os.path.join(out_dir, c["file"]), mmap_mode="r") for c in manifest["columns"]}
+
+
+# DataFrame over the memory-mapped columns when the binary copy is fresh, else parse the CSV.
+# pandas is imported here rather than at module level, the freshness checks don't need it.
+def read_dataset(csv_path):
+    import pandas as pd
+
+    manifest = read_manifest(csv_path)
+    if manifest is not None and is_fresh(csv_path, manifest):
+        return pd.DataFrame(load_columns(csv_path, manifest), copy=False)
+    return pd.read_csv(csv_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a CSV dataset to memory-mappable typed columns.")
+    parser.add_argument("csv", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "mortality_data.csv"))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    out_dir = convert_csv(args.csv)
+    manifest = read_manifest(args.csv)
+    dtypes = dict(Counter(c["dtype"] for c in manifest["columns"]))
+    print(f"Wrote {out_dir} in {time.perf_counter() - start:.2f}s: {manifest['rows']} rows, column dtypes {dtypes}")
@@ -0,0 +1,157 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, NUMERIC_QUESTIONS
+
+DUMMY_DTYPE = np.dtype(np.int8)
+NUMERIC_DTYPE = np.dtype(np.int16)
+
+
+# Feature matrix stored in 1 byte per one-hot dummy and 2 bytes per numeric
+# answer (counts, ages, months) instead of 8 bytes per value: 50 bytes a row
+# for the 45 feature columns against 360 as float64. Each row is one record
+# of a uint8 buffer, the dummies first and the numerics after them, so row
+# ranges are zero-copy slices and every column is a zero-copy strided view.
+# Models see float64 only at the boundary: np.asarray(matrix) (which sklearn
+# and compiled.py call on their input) upcasts into the model's column order.
+class CompactMatrix:
+    def __init__(self, data, columns=FEATURE_COLUMNS):
+        self.columns = list(columns)
+        self._numeric = [i for i, column in enumerate(self.columns) if column in NUMERIC_QUESTIONS]
+        self._dummy = [i for i, column in enumerate(self.columns) if column not in NUMERIC_QUESTIONS]
+        self._n_dummy = len(self._dummy)
+        # column -> (block, position in the block)
+        self._position = {}
+        for block, indices in (("dummies", self._dummy), ("numerics", self._numeric)):
+            for position, i in enumerate(indices):
+                self._position[self.columns[i]] = (block, position)
+        row_bytes = self._n_dummy * DUMMY_DTYPE.itemsize + len(self._numeric) * NUMERIC_DTYPE.itemsize
+        if data.dtype != np.uint8 or data.ndim != 2 or data.shape[1] != row_bytes:
+            raise ValueError(f"Expected a uint8 buffer of {row_bytes} bytes per row, got {data.dtype} {data.shape}")
+        self.data = data
+
+    @classmethod
+    def empty(cls, n_rows, columns=FEATURE_COLUMNS):
+        n_numeric = sum(column in NUMERIC_QUESTIONS for column in columns)
+        row_bytes = (len(columns) - n_numeric) * DUMMY_DTYPE.itemsize + n_numeric * NUMERIC_DTYPE.itemsize
+        return cls(np.zeros((n_rows, row_bytes), dtype=np.uint8), columns)
+
+    # From a (n_rows, n_columns) array in column order
+    @classmethod
+    def from_array(cls, X, columns=FEATURE_COLUMNS):
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != len(columns):
+            raise ValueError(f"Expected rows of {len(columns)} values, got shape {X.shape}")
+        matrix = cls.empty(len(X), columns)
+        matrix.write(0, X)
+        return matrix
+
+    # From the feature columns of a DataFrame, one column at a time, so a large
+    # extract is never held as a full float64 matrix
+    @classmethod
+    def from_frame(cls, df, columns=FEATURE_COLUMNS):
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            raise ValueError(f"Input is missing feature columns: {missing}")
+        matrix = cls.empty(len(df), columns)
+        for column in columns:
+            matrix._store(column, slice(None), df[column].to_numpy())
+        return matrix
+
+    @property
+    def dummies(self):
+        return self.data[:, :self._n_dummy].view(DUMMY_DTYPE)
+
+    @property
+    def numerics(self):
+        return self.data[:, self._n_dummy:].view(NUMERIC_DTYPE)
+
+    @property
+    def shape(self):
+        return len(self.data), len(self.columns)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __len__(self):
+        return len(self.data)
+
+    # Zero-copy view of one column in its storage dtype
+    def column(self, name):
+        block, position = self._position[name]
+        return getattr(self, block)[:, position]
+
+    # matrix[rows] is a CompactMatrix over those rows (a view for slices);
+    # matrix[rows, j] is column j of the model's column order
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, j = key
+            return self.column(self.columns[j])[rows]
+        return CompactMatrix(self.data[key], self.columns)
+
+    def _store(self, column, rows, values):
+        block, _ = self._position[column]
+        dtype = DUMMY_DTYPE if block == "dummies" else NUMERIC_DTYPE
+        values = np.asarray(values)
+        stored = values.astype(dtype)
+        if not np.array_equal(stored, values):
+            info = np.iinfo(dtype)
+            raise ValueError(f"Column {column!r} has values that are not whole numbers in [{info.min}, {info.max}]")
+        self.column(column)[rows] = stored
+
+    # Overwrite rows start.. with X ((n_rows, n_columns) in column order)
+    def write(self, start, X):
+        rows = slice(start, start + len(X))
+        for i, column in enumerate(self.columns):
+            self._store(column, rows, X[:, i])
+
+    # Upcast into a (n_rows, n_columns) matrix in column order for the model,
+    # a block of rows at a time so the scattered writes stay in cache
+    def to_float(self, dtype=np.float64, block_rows=8192):
+        out = np.empty(self.shape, dtype=dtype)
+        dummies, numerics = self.dummies, self.numerics
+        for start in range(0, len(out), block_rows):
+            rows = slice(start, start + block_rows)
+            block = out[rows]
+            block[:, self._dummy] = dummies[rows]
+            block[:, self._numeric] = numerics[rows]
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_float(np.float64 if dtype is None else dtype)
+
+    # Row-major bytes: the bytes of rows a..b followed by those of b..c are the bytes of a..c
+    def tobytes(self):
+        return self.data.tobytes()
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Compare the compact feature matrix with the float64 one.")
+    parser.add_argument("--data", default=os.path.join(current_dir, "data", "mortality_data.csv"))
+    parser.add_argument("--scale", type=int, default=100, help="repeat the dataset this many times")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    df = pd.concat([df] * args.scale, ignore_index=True)
+    start = time.perf_counter()
+    dense = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    dense_ms = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    compact = CompactMatrix.from_frame(df)
+    compact_ms = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    upcast = np.asarray(compact)
+    upcast_ms = (time.perf_counter() - start) * 1e3
+    assert np.array_equal(upcast, dense)
+
+    print(f"{len(df):,} rows x {len(FEATURE_COLUMNS)} features")
+    print(f"float64: {dense.nbytes / 2**20:8.1f} MiB, built in {dense_ms:.0f}ms")
+    print(f"compact: {compact.nbytes / 2**20:8.1f} MiB, built in {compact_ms:.0f}ms "
+          f"({dense.nbytes / compact.nbytes:.1f}x smaller), upcast in {upcast_ms:.0f}ms")
@@ -0,0 +1,267 @@
+import json
+import os
+
+import numpy as np
+
+EXPORT_FORMAT = "compiled-adaboost-v1"
+EXPORT_META = "model.json"
+
+
+def is_export(path):
+    return os.path.isfile(os.path.join(path, EXPORT_META))
+
+
+# The <model>.arrays export next to a pickle, if it was made from exactly this
+# pickle (same sha256), else None
+def matching_export(model_path, sha256):
+    export = os.path.splitext(model_path)[0] + ".arrays"
+    if not is_export(export):
+        return None
+    with open(os.path.join(export, EXPORT_META)) as f:
+        meta = json.load(f)
+    return export if meta.get("format") == EXPORT_FORMAT and meta.get("source_sha256") == sha256 else None
+
+
+# Compiled form of a fitted AdaBoostClassifier of decision trees (optionally the
+# last step of an imblearn Pipeline whose other steps are samplers).
+# All tree nodes are flattened into contiguous arrays and every leaf stores its
+# precomputed contribution to the decision function, so scoring is a handful of
+# vectorized NumPy gathers instead of a Python loop over sklearn estimators.
+# Labels, decision scores and probabilities are bit-identical to sklearn's.
+class CompiledEnsemble:
+    # Rows scored per block, keeps the (rows, estimators, classes) buffers small
+    block_size = 1024
+
+    def __init__(self, feature, threshold, left, right, roots, leaf_values, classes, total_weight, max_depth, n_features_in_=None):
+        self.n_features_in_ = n_features_in_
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.roots = roots
+        self.leaf_values = leaf_values
+        self.classes_ = classes
+        self.total_weight = total_weight
+        self.max_depth = int(max_depth)
+        self.n_classes_ = len(classes)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self._children = np.stack([left, right], axis=1).ravel()
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    # Export as plain .npy arrays plus a small JSON header, readable with NumPy alone
+    def save(self, directory, source_sha256=None):
+        os.makedirs(directory, exist_ok=True)
+        n_nodes = len(self.feature)
+        index_dtype = np.int32 if n_nodes < 2 ** 31 else np.int64
+        arrays = {
+            "feature": self.feature.astype(np.int16 if self.n_features_in_ and self.n_features_in_ < 2 ** 15 else np.int32),
+            "threshold": self.threshold,
+            "left": self.left.astype(index_dtype),
+            "right": self.right.astype(index_dtype),
+            "roots": self.roots.astype(index_dtype),
+            "leaf_values": self.leaf_values,
+            "classes": self.classes_,
+            "total_weight": np.asarray(self.total_weight, dtype=np.float64),
+        }
+        for name, values in arrays.items():
+            np.save(os.path.join(directory, name + ".npy"), np.ascontiguousarray(values))
+        meta = {
+            "format": EXPORT_FORMAT,
+            "max_depth": self.max_depth,
+            "n_features_in": self.n_features_in_,
+            "n_estimators": self.n_estimators,
+            "source_sha256": source_sha256,
+        }
+        # Header last, so a partly written export is never loadable
+        with open(os.path.join(directory, EXPORT_META + ".tmp"), "w") as f:
+            json.dump(meta, f, indent=1)
+        os.replace(os.path.join(directory, EXPORT_META + ".tmp"), os.path.join(directory, EXPORT_META))
+
+    # Load an export; with mmap the node arrays are mapped read-only instead of read
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, EXPORT_META)) as f:
+            meta = json.load(f)
+        if meta.get("format") != EXPORT_FORMAT:
+            raise ValueError(f"{directory} is not a {EXPORT_FORMAT} export")
+
+        def array(name):
+            return np.load(os.path.join(directory, name + ".npy"), mmap_mode="r" if mmap else None, allow_pickle=False)
+
+        return cls(
+            feature=array("feature"),
+            threshold=array("threshold"),
+            left=array("left"),
+            right=array("right"),
+            roots=array("roots"),
+            leaf_values=array("leaf_values"),
+            classes=np.load(os.path.join(directory, "classes.npy"), allow_pickle=False),
+            total_weight=float(np.load(os.path.join(directory, "total_weight.npy"))),
+            max_depth=meta["max_depth"],
+            n_features_in_=meta["n_features_in"],
+        )
+
+    # Leaf node reached by every (estimator, row) pair
+    def _leaves(self, X):
+        n_rows, n_features = X.shape
+        # Same test as sklearn's tree: float32 feature value <= float64 threshold
+        flat = X.astype(np.float32).ravel().astype(np.float64)
+        row_base = (np.arange(n_rows) * n_features)[np.newaxis, :]
+        node = np.broadcast_to(self.roots[:, np.newaxis], (len(self.roots), n_rows))
+        for _ in range(self.max_depth):
+            go_right = ~(flat.take(row_base + self.feature.take(node)) <= self.threshold.take(node))
+            node = self._children.take(2 * node + go_right)
+        return node
+
+    def _decision_block(self, X):
+        # (estimators, rows, classes) summed over the leading estimator axis; NumPy
+        # reduces a leading axis one slice at a time, the same order as sklearn's sum()
+        pred = self.leaf_values.take(self._leaves(X), axis=0).sum(axis=0)
+        pred /= self.total_weight
+        if self.n_classes_ == 2:
+            pred[:, 0] *= -1
+            return pred.sum(axis=1)
+        return pred
+
+    # Same checks as sklearn's predict(): a 2D array of n_features_in_ finite
+    # values per row. Out-of-range indices or NaN would otherwise be scored silently.
+    def _check_input(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2D array, got {X.ndim}D array instead. "
+                             "Reshape your data with array.reshape(1, -1) if it contains a single sample.")
+        if self.n_features_in_ is not None and X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but {type(self).__name__} "
+                             f"is expecting {self.n_features_in_} features as input.")
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity.")
+        return X
+
+    def decision_function(self, X):
+        X = self._check_input(X)
+        if len(X) <= self.block_size:
+            return self._decision_block(X)
+        return np.concatenate([
+            self._decision_block(X[start:start + self.block_size])
+            for start in range(0, len(X), self.block_size)
+        ])
+
+    def _labels(self, pred):
+        if self.n_classes_ == 2:
+            return self.classes_.take(pred > 0, axis=0)
+        return self.classes_.take(np.argmax(pred, axis=1), axis=0)
+
+    # Overwrites decision in the multi-class case
+    def _proba(self, decision):
+        if self.n_classes_ == 2:
+            decision = np.vstack([-decision, decision]).T / 2
+        else:
+            decision /= self.n_classes_ - 1
+        # softmax, written the same way as sklearn.utils.extmath.softmax
+        decision -= np.max(decision, axis=1).reshape((-1, 1))
+        np.exp(decision, decision)
+        decision /= np.sum(decision, axis=1).reshape((-1, 1))
+        return decision
+
+    def predict(self, X):
+        return self._labels(self.decision_function(X))
+
+    def predict_proba(self, X):
+        return self._proba(self.decision_function(X))
+
+    # predict() and predict_proba() from a single pass over the trees
+    def predict_with_proba(self, X):
+        decision = self.decision_function(X)
+        labels = self._labels(decision)
+        return labels, self._proba(decision)
+
+
+def _final_estimator(model):
+    if not hasattr(model, "steps"):
+        return model
+    for name, step in model.steps[:-1]:
+        if step is not None and step != "passthrough" and not hasattr(step, "fit_resample"):
+            raise ValueError(f"Pipeline step {name!r} transforms X at predict time and cannot be compiled")
+    return model.steps[-1][1]
+
+
+# Per-leaf class probabilities, normalized the way DecisionTreeClassifier.predict_proba does
+def _leaf_proba(tree, n_classes):
+    proba = tree.value[:, 0, :n_classes].copy()
+    normalizer = proba.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    proba /= normalizer
+    return proba
+
+
+# Compile a fitted AdaBoost model into a CompiledEnsemble
+def compile_model(model):
+    ada = _final_estimator(model)
+    if not all(hasattr(ada, attr) for attr in ("estimators_", "estimator_weights_", "algorithm")):
+        raise ValueError(f"{type(ada).__name__} is not a fitted AdaBoost classifier")
+
+    classes = np.asarray(ada.classes_)
+    n_classes = len(classes)
+    features, thresholds, lefts, rights, roots, values = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator, weight in zip(ada.estimators_, ada.estimator_weights_):
+        tree = estimator.tree_
+        is_leaf = tree.children_left < 0
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes)
+
+        if ada.algorithm == "SAMME.R":
+            # _samme_proba applied to every node's probabilities up front
+            proba = _leaf_proba(tree, n_classes)
+            np.clip(proba, np.finfo(proba.dtype).eps, None, out=proba)
+            log_proba = np.log(proba)
+            value = (n_classes - 1) * (log_proba - (1.0 / n_classes) * log_proba.sum(axis=1)[:, np.newaxis])
+        else:
+            # (estimator.predict(X) == classes).T * w, the tree predicts the argmax of its raw node values
+            predicted = np.argmax(tree.value[:, 0, :n_classes], axis=1)
+            value = (predicted[:, np.newaxis] == np.arange(n_classes)) * weight
+
+        # Leaves point to themselves so every row can take exactly max_depth steps
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        values.append(value)
+        roots.append(offset)
+        offset += n_nodes
+        max_depth = max(max_depth, tree.max_depth)
+
+    return CompiledEnsemble(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.intp),
+        right=np.concatenate(rights).astype(np.intp),
+        roots=np.asarray(roots, dtype=np.intp),
+        leaf_values=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        classes=classes,
+        total_weight=ada.estimator_weights_.sum(),
+        max_depth=max_depth,
+        n_features_in_=getattr(ada, "n_features_in_", None),
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import hashlib
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Export a pickled AdaBoost model as NumPy arrays.")
+    parser.add_argument("model", help="pickled AdaBoost model or imblearn Pipeline")
+    parser.add_argument("output", nargs="?", help="export directory (default: <model>.arrays)")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        content = f.read()
+    model = pickle.loads(content)
+    output = args.output or os.path.splitext(args.model)[0] + ".arrays"
+    compile_model(model).save(output, source_sha256=hashlib.sha256(content).hexdigest())
+    print(f"Exported {args.model} to {output}")
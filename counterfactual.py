@@ -0,0 +1,155 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from compiled import compile_model
+from features import CATEGORICAL_QUESTIONS, ENCODER, random_answers
+
+# Questions a family or health worker can act on; region, the child's sex,
+# twin birth etc. are still available by passing questions explicitly
+MODIFIABLE_QUESTIONS = ["wealth", "tv", "radio", "toilet", "water", "mother_educ", "mother_working",
+                        "contraceptive", "breastfeeding"]
+
+RISK_LABEL = 1
+
+# (fingerprint, evaluator) of the last model seen by counterfactuals()
+_evaluator = (None, None)
+
+
+# The compiled form of an AdaBoost model (same labels and probabilities,
+# several times faster on a batch, see compiled.py), built once per model
+# fingerprint; other models are used as they are
+def _batch_evaluator(model, fingerprint):
+    global _evaluator
+    if fingerprint is None:
+        return model
+    if _evaluator[0] != fingerprint:
+        try:
+            evaluator = compile_model(model)
+        except ValueError:
+            evaluator = model
+        _evaluator = (fingerprint, evaluator)
+    return _evaluator[1]
+
+
+# Every alternative answer of the given questions as a change vector against
+# the encoded profile: (question, option) pairs and a (n_changes, n_features)
+# matrix of deltas. Options encoding the same as the current answer are skipped.
+def _changes(answers, row, questions):
+    changes, deltas = [], []
+    for question in questions:
+        for option in CATEGORICAL_QUESTIONS[question]:
+            if option == answers[question]:
+                continue
+            delta = ENCODER.encode(dict(answers, **{question: option})) - row
+            if delta.any():
+                changes.append((question, option))
+                deltas.append(delta)
+    return changes, np.array(deltas).reshape(len(deltas), len(row))
+
+
+# Every single and two-question change of a profile, scored in one batch.
+# All variants are built as one matrix (profile + one or two change vectors,
+# pairs only across different questions) and go through a single predict,
+# plus a single predict_proba when the model has one. Passing the model's
+# fingerprint lets an AdaBoost model be compiled once and reused.
+# Returns the profile's own label and risk probability, the number of
+# variants scored, and the variants whose label differs from the profile's,
+# ranked: fewer changes first, then the largest move of the risk probability
+# away from the current label.
+def counterfactuals(model, answers, questions=None, max_changes=2, fingerprint=None):
+    start = time.perf_counter()
+    model = _batch_evaluator(model, fingerprint)
+    questions = list(CATEGORICAL_QUESTIONS) if questions is None else list(questions)
+    row = ENCODER.encode(answers)
+    changes, deltas = _changes(answers, row, questions)
+
+    first, second = np.arange(len(changes)), np.full(len(changes), -1)
+    if max_changes >= 2 and len(changes) > 1:
+        owner = np.array([questions.index(question) for question, _ in changes])
+        i, j = np.triu_indices(len(changes), k=1)
+        across = owner[i] != owner[j]
+        first, second = np.concatenate([first, i[across]]), np.concatenate([second, j[across]])
+
+    # Row 0 is the profile itself; the padding row of zeros stands in for "no second change"
+    padded = np.vstack([deltas, np.zeros((1, len(row)))])
+    variants = np.vstack([row, row + padded[first] + padded[second]])
+    has_proba = hasattr(model, "predict_proba") and RISK_LABEL in list(model.classes_)
+    if has_proba and hasattr(model, "predict_with_proba"):
+        labels, proba = model.predict_with_proba(variants)
+    else:
+        labels = model.predict(variants)
+        proba = model.predict_proba(variants) if has_proba else None
+    labels = np.asarray(labels)
+    if proba is not None:
+        proba = proba[:, list(model.classes_).index(RISK_LABEL)]
+
+    label = labels[0]
+    flipped = np.flatnonzero(labels[1:] != label)
+    n_changes = 1 + (second[flipped] >= 0)
+    # Toward lower risk when currently at risk, toward higher risk otherwise
+    shift = np.zeros(len(flipped)) if proba is None else (proba[0] - proba[1:][flipped]) * (1 if label == RISK_LABEL else -1)
+    order = np.lexsort((-shift, n_changes))
+
+    flips = []
+    for k in order:
+        v = flipped[k]
+        picked = [changes[first[v]]] + ([changes[second[v]]] if second[v] >= 0 else [])
+        flips.append({
+            "changes": [(question, answers[question], option) for question, option in picked],
+            "label": labels[1 + v],
+            "risk_probability": None if proba is None else float(proba[1 + v]),
+        })
+    return {
+        "label": label,
+        "risk_probability": None if proba is None else float(proba[0]),
+        "evaluated": len(variants) - 1,
+        "flips": flips,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# Expander listing the top flips of a counterfactuals() result; streamlit is
+# only imported when it is shown
+def render_counterfactuals(result, top=10):
+    import streamlit as st
+
+    with st.expander("What could change this prediction?"):
+        if not result["flips"]:
+            st.write(f"None of the {result['evaluated']} single or paired answer changes would change the prediction.")
+            return
+        st.write(f"{len(result['flips'])} of {result['evaluated']} single or paired answer changes would change the prediction. "
+                 f"The {min(top, len(result['flips']))} smallest changes with the largest effect:")
+        st.dataframe([{
+            "Changes": "; ".join(f"{question.replace('_', ' ')}: {old} → {new}" for question, old, new in flip["changes"]),
+            "Prediction": "at risk" if flip["label"] == RISK_LABEL else "not at risk",
+            "Risk probability": flip["risk_probability"],
+        } for flip in result["flips"][:top]])
+
+
+if __name__ == "__main__":
+    from resources import load_model
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Time the counterfactual sweep over random form answers.")
+    parser.add_argument("--model", default=os.path.join(current_dir, "adaboost2.pkl"))
+    parser.add_argument("--profiles", type=int, default=50)
+    parser.add_argument("--all-questions", action="store_true", help="vary every question, not only modifiable ones")
+    parser.add_argument("--uncompiled", action="store_true", help="score with the loaded model as it is")
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    questions = None if args.all_questions else MODIFIABLE_QUESTIONS
+    rng = np.random.default_rng(0)
+    fingerprint = None if args.uncompiled else args.model
+    counterfactuals(model, random_answers(rng), questions, fingerprint=fingerprint)
+    results = [counterfactuals(model, random_answers(rng), questions, fingerprint=fingerprint) for _ in range(args.profiles)]
+    seconds = np.array([r["seconds"] for r in results]) * 1e3
+    print(f"{args.profiles} profiles, {results[0]['evaluated']} variants each: "
+          f"p50 {np.percentile(seconds, 50):.1f}ms, p99 {np.percentile(seconds, 99):.1f}ms, max {seconds.max():.1f}ms")
+    best = max(results, key=lambda r: len(r["flips"]))
+    print(f"Most flips: {len(best['flips'])} of {best['evaluated']}, top 5:")
+    for flip in best["flips"][:5]:
+        print("  " + "; ".join(f"{q}: {old} -> {new}" for q, old, new in flip["changes"]), flip["risk_probability"])
@@ -0,0 +1,55 @@
+import threading
+
+import streamlit as st
+
+# Summaries are computed once per loaded dataset and shared by all sessions.
+# resources returns the same DataFrame object until the file changes, so the
+# object identity is the cache key; the DataFrame itself is kept alongside so
+# its id cannot be reused by another object.
+_summary_lock = threading.Lock()
+_summary_cache = {}
+
+
+def dataset_summary(df, target="b5"):
+    with _summary_lock:
+        entry = _summary_cache.get(id(df))
+        if entry is not None and entry[0] is df:
+            return entry[1]
+
+    summary = {
+        "rows": len(df),
+        "columns": df.shape[1],
+        "statistics": df.describe().T[["mean", "std", "min", "max"]],
+    }
+    if target in df.columns:
+        counts = df[target].value_counts().sort_index()
+        summary["class_balance"] = counts.to_frame("children").assign(share=counts / counts.sum())
+
+    with _summary_lock:
+        # Only the current dataset is worth keeping, drop summaries of reloaded ones
+        _summary_cache.clear()
+        _summary_cache[id(df)] = (df, summary)
+    return summary
+
+
+# Show precomputed summary statistics and one page of rows, instead of sending
+# the whole dataset to the browser on every rerun. Instead of a DataFrame, a
+# summary kept up to date elsewhere and a rows(start, stop) function returning
+# one page as a DataFrame can be passed (Snapshot.summary() and Snapshot.frame
+# of ingest.py), so the full dataset is never materialized as a DataFrame.
+def render_dataset(df=None, page_size=50, key="dataset_page", summary=None, rows=None):
+    if summary is None:
+        summary = dataset_summary(df)
+    if rows is None:
+        rows = lambda start, stop: df.iloc[start:stop]
+    st.write(f"{summary['rows']:,} children, {summary['columns']} columns")
+    if "class_balance" in summary:
+        st.dataframe(summary["class_balance"])
+
+    with st.expander("Column statistics"):
+        st.dataframe(summary["statistics"])
+
+    n_pages = max(1, -(-summary["rows"] // page_size))
+    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key=key)
+    start = (page - 1) * page_size
+    st.dataframe(rows(start, start + page_size))
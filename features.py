@@ -0,0 +1,244 @@
+from operator import itemgetter
+
+import numpy as np
+
+
+# Feature columns in the order the model was trained on
+FEATURE_COLUMNS = ["rural",
+                   "region_mindanao",
+                   "region_visayas",
+                   "householdhead_female",
+                   "wealth_poorer",
+                   "wealth_middle",
+                   "wealth_richer",
+                   "wealth_richest",
+                   "freqtv_lessthanonce",
+                   "freqtv_atleasonce",
+                   "freqradio_lessthanonce",
+                   "freqradio_atleasonce",
+                   "toilet_unimproved",
+                   "toilet_open_defecation",
+                   "toilet_unknown",
+                   "drinkingwater_unimproved",
+                   "drinkingwater_unknown",
+                   "mother_age_20_24",
+                   "mother_age_25_29",
+                   "mother_age_30_34",
+                   "mother_age_35_39",
+                   "mother_age_40_44",
+                   "mother_age_45_49",
+                   "mothereduc_primary",
+                   "mothereduc_secondary",
+                   "mothereduc_higher",
+                   "mother_working",
+                   "total_children_born",
+                   "age_first_birth",
+                   "total_births_last5years",
+                   "contraceptive_folk",
+                   "contraceptive_traditional",
+                   "contraceptive_modern",
+                   "breastfeeding_never",
+                   "breastfeeding_still",
+                   "child_sex_female",
+                   "child_age_months",
+                   "twin_1st",
+                   "twin_2nd",
+                   "preceding_birthinterval_months",
+                   "childsize_larger",
+                   "childsize_average",
+                   "childsize_smaller",
+                   "childsize_verysmall",
+                   "childsize_unknown"]
+
+# Selectbox questions: each option sets one dummy column to 1, or none (baseline)
+CATEGORICAL_QUESTIONS = {
+    "rural": {
+        "Urban Area": None,
+        "Rural Area": "rural"},
+    "region": {
+        "Luzon": None,
+        "Visayas": "region_visayas",
+        "Mindanao": "region_mindanao"},
+    "householdhead": {
+        "Male": None,
+        "Female": "householdhead_female"},
+    "wealth": {
+        "less than Php10,957": None,
+        "Php10,957-Php43,828": "wealth_poorer",
+        "Php43,828-Php76,669": "wealth_middle",
+        "Php76,669-Php219,140": "wealth_richer",
+        "more than Php219,140": "wealth_richest"},
+    "tv": {
+        "I don't watch TV": None,
+        "Less than once a week": "freqtv_lessthanonce",
+        "At least once a week": "freqtv_atleasonce"},
+    "radio": {
+        "I don't listen to radio": None,
+        "Less than once a week": "freqradio_lessthanonce",
+        "At least once a week": "freqradio_atleasonce"},
+    "toilet": {
+        "Improved Toilet Facility": None,
+        "Unimproved Toilet Facility": "toilet_unimproved",
+        "Open Defecation": "toilet_open_defecation",
+        "I don't know": "toilet_unknown"},
+    "water": {
+        "Improved Drinking Water Source": None,
+        "Unimproved Drinking Water Source": "drinkingwater_unimproved",
+        "I don't know": "drinkingwater_unknown"},
+    "mother_age": {
+        "less than 20": None,
+        "20-24": "mother_age_20_24",
+        "25-29": "mother_age_25_29",
+        "30-34": "mother_age_30_34",
+        "35-39": "mother_age_35_39",
+        "40-44": "mother_age_40_44",
+        "45-49": "mother_age_45_49",
+        "more than 49": None},
+    "mother_educ": {
+        "None": None,
+        "Elementary": "mothereduc_primary",
+        "Highschool": "mothereduc_secondary",
+        "College or Higher": "mothereduc_higher"},
+    "mother_working": {
+        "No": None,
+        "Yes": "mother_working"},
+    "contraceptive": {
+        "None": None,
+        "Folkloric method": "contraceptive_folk",
+        "Traditional method": "contraceptive_traditional",
+        "Modern method": "contraceptive_modern"},
+    "breastfeeding": {
+        "Never": "breastfeeding_never",
+        "Yes, before": None,
+        "Yes, up to now": "breastfeeding_still"},
+    "child_sex": {
+        "Male": None,
+        "Female": "child_sex_female"},
+    "twin": {
+        "No": None,
+        "Yes, 1st born": "twin_1st",
+        "Yes, last born": "twin_2nd"},
+    "child_size": {
+        "Larger": "childsize_larger",
+        "Average": "childsize_average",
+        "Smaller": "childsize_smaller",
+        "Very Small": "childsize_verysmall",
+        "Unknown": "childsize_unknown"},
+}
+
+# number_input questions, keyed by feature column, with the widget bounds
+NUMERIC_QUESTIONS = {
+    "total_children_born": {"min_value": 1, "max_value": 50},
+    "age_first_birth": {"min_value": 1, "max_value": 50},
+    "total_births_last5years": {"min_value": 1, "max_value": 10},
+    "child_age_months": {"min_value": 0, "max_value": 60},
+    "preceding_birthinterval_months": {"min_value": 0, "max_value": 500},
+}
+
+# Answers that cannot exceed another answer: (column, at most this column)
+ORDERING_CONSTRAINTS = [("total_births_last5years", "total_children_born")]
+
+
+# Random form answers that pass the form's checks: a random option of every
+# selectbox and a whole number within every number_input's bounds, redrawn
+# below its limit for ORDERING_CONSTRAINTS. One answer dict, or with n_samples
+# a {question: array} dict for FeatureEncoder.encode_columns.
+def random_answers(rng, n_samples=None):
+    answers = {question: rng.choice(list(options), size=n_samples) for question, options in CATEGORICAL_QUESTIONS.items()}
+    for column, bounds in NUMERIC_QUESTIONS.items():
+        answers[column] = rng.integers(bounds["min_value"], bounds["max_value"] + 1, size=n_samples)
+    for column, limit in ORDERING_CONSTRAINTS:
+        bounds = NUMERIC_QUESTIONS[column]
+        answers[column] = rng.integers(bounds["min_value"], np.minimum(bounds["max_value"], answers[limit]) + 1,
+                                       size=n_samples)
+    if n_samples is None:
+        answers = {question: str(value) if question in CATEGORICAL_QUESTIONS else int(value)
+                   for question, value in answers.items()}
+    return answers
+
+
+# Turns form answers into feature rows in the model's column order.
+# Lookup tables are built once in __init__ and never mutated afterwards, and
+# every call writes into its own freshly allocated array, so one encoder can
+# be shared by all Streamlit sessions and threads.
+class FeatureEncoder:
+    def __init__(self, feature_columns=FEATURE_COLUMNS, categorical=CATEGORICAL_QUESTIONS, numeric=NUMERIC_QUESTIONS):
+        self.feature_columns = list(feature_columns)
+        column_index = {column: i for i, column in enumerate(self.feature_columns)}
+
+        # question -> {option: column index, or -1 for the baseline option}
+        self._categorical = {}
+        for question, options in categorical.items():
+            self._categorical[question] = {
+                option: (-1 if column is None else column_index[column]) for option, column in options.items()
+            }
+        self._numeric = [(column, column_index[column]) for column in numeric]
+
+        covered = [i for lookup in self._categorical.values() for i in lookup.values() if i >= 0]
+        covered += [i for _, i in self._numeric]
+        missing = set(range(len(self.feature_columns))) - set(covered)
+        if missing:
+            raise ValueError(f"No question sets feature columns {[self.feature_columns[i] for i in sorted(missing)]}")
+
+    @property
+    def questions(self):
+        return list(self._categorical) + [column for column, _ in self._numeric]
+
+    def _option_index(self, question, option):
+        try:
+            return self._categorical[question][option]
+        except KeyError:
+            raise ValueError(f"Unknown answer {option!r} for question {question!r}") from None
+
+    # Encode one answer dict into a (n_features,) float row
+    def encode(self, answers):
+        row = np.zeros(len(self.feature_columns), dtype=np.float64)
+        for question in self._categorical:
+            i = self._option_index(question, answers[question])
+            if i >= 0:
+                row[i] = 1.0
+        for column, i in self._numeric:
+            row[i] = answers[column]
+        return row
+
+    # Encode many answer dicts into a (n_rows, n_features) float matrix
+    def encode_many(self, answers_list):
+        columns = {question: list(map(itemgetter(question), answers_list)) for question in self.questions}
+        return self.encode_columns(columns)
+
+    # Encode column-oriented answers ({question: sequence of answers}) into a matrix
+    def encode_columns(self, columns):
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        matrix = np.zeros((n_rows, len(self.feature_columns)), dtype=np.float64)
+        rows = np.arange(n_rows)
+        for question, lookup in self._categorical.items():
+            values = columns[question]
+            try:
+                indices = np.fromiter(map(lookup.__getitem__, values), dtype=np.intp, count=n_rows)
+            except KeyError as e:
+                raise ValueError(f"Unknown answer {e.args[0]!r} for question {question!r}") from None
+            chosen = indices >= 0
+            matrix[rows[chosen], indices[chosen]] = 1.0
+        for column, i in self._numeric:
+            matrix[:, i] = columns[column]
+        return matrix
+
+    # Decode the one-hot columns of a question back into option codes, one per
+    # row: positions in list(CATEGORICAL_QUESTIONS[question]). Rows with none
+    # of the dummies set get the first option that sets no column (not always
+    # the first option, e.g. breastfeeding); a question where every option
+    # sets a column cannot be decoded from such rows and raises ValueError.
+    # Assumes at most one dummy of the question is set per row.
+    def decode_codes(self, matrix, question):
+        lookup = self._categorical[question]
+        indices = list(lookup.values())
+        if -1 not in indices:
+            raise ValueError(f"Question {question!r} has no baseline option, every answer sets a dummy column")
+        codes = np.full(len(matrix), indices.index(-1), dtype=np.int8)
+        for code, i in enumerate(indices):
+            if i >= 0:
+                codes[np.asarray(matrix[:, i]) == 1] = code
+        return codes
+
+
+ENCODER = FeatureEncoder()
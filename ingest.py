@@ -0,0 +1,372 @@
+import argparse
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from compact import CompactMatrix
+from features import FEATURE_COLUMNS
+from schema import SCHEMA
+
+TARGET = "b5"
+
+# Bytes before the consumed end of the CSV that must be unchanged for new
+# bytes to count as appended rows (otherwise the file was rewritten)
+_TAIL_CHECK = 4096
+
+
+class SchemaError(ValueError):
+    pass
+
+
+# Check incoming columns against the store's; every feature column and the
+# target must be there, and nothing else
+def check_schema(columns, expected):
+    columns = list(columns)
+    missing = [column for column in expected if column not in columns]
+    unexpected = [column for column in columns if column not in expected]
+    if missing or unexpected:
+        raise SchemaError(f"Rows do not match the dataset schema: missing columns {missing}, unexpected columns {unexpected}")
+    if len(set(columns)) != len(columns):
+        raise SchemaError("Rows have duplicate column names")
+
+
+# Per-column count, mean, sum of squared deviations, min and max, plus the
+# class counts of the target. Merging the statistics of a new block uses
+# Chan et al.'s pairwise update, so means and variances stay exact to
+# rounding no matter how rows arrive in batches.
+def _block_aggregates(block, target_index):
+    classes, counts = np.unique(block[:, target_index], return_counts=True) if target_index is not None else ((), ())
+    return {
+        "count": len(block),
+        "mean": block.mean(axis=0),
+        "m2": ((block - block.mean(axis=0)) ** 2).sum(axis=0),
+        "min": block.min(axis=0),
+        "max": block.max(axis=0),
+        "classes": dict(zip(classes.tolist(), counts.tolist())),
+    }
+
+
+def _merge_aggregates(a, b):
+    if a is None:
+        return b
+    count = a["count"] + b["count"]
+    delta = b["mean"] - a["mean"]
+    classes = dict(a["classes"])
+    for label, n in b["classes"].items():
+        classes[label] = classes.get(label, 0) + n
+    return {
+        "count": count,
+        "mean": a["mean"] + delta * (b["count"] / count),
+        "m2": a["m2"] + b["m2"] + delta ** 2 * (a["count"] * b["count"] / count),
+        "min": np.minimum(a["min"], b["min"]),
+        "max": np.maximum(a["max"], b["max"]),
+        "classes": classes,
+    }
+
+
+# Immutable view of the store at one moment: the first n_rows rows and the
+# aggregates over exactly those rows. Feature columns are held compactly (see
+# compact.py), the other columns (row id, target) as float64. Rows below
+# n_rows are never written again, so a snapshot stays valid while later rows
+# are appended.
+class Snapshot:
+    def __init__(self, columns, dtypes, features, other, aggregates, version):
+        self.columns = columns
+        self.dtypes = dtypes
+        self.other_columns = [column for column in columns if column not in FEATURE_COLUMNS]
+        self._features = features
+        self.other = other
+        self.aggregates = aggregates
+        self.version = version
+        self._frame = None
+        self._lock = threading.Lock()
+
+    @property
+    def n_rows(self):
+        return len(self._features)
+
+    @property
+    def nbytes(self):
+        return self._features.nbytes + self.other.nbytes
+
+    # Zero-copy view of one column
+    def column(self, name):
+        if name in FEATURE_COLUMNS:
+            return self._features.column(name)
+        return self.other[:, self.other_columns.index(name)]
+
+    # CompactMatrix of the feature columns in the model's order; pass it to the
+    # model as it is, it is upcast to float64 there
+    def features(self):
+        return self._features
+
+    # DataFrame of rows start..stop with the source's column dtypes; the whole
+    # dataset's is built once per snapshot
+    def frame(self, start=0, stop=None):
+        import pandas as pd
+
+        if start or stop is not None:
+            return pd.DataFrame({column: self.column(column)[start:stop] for column in self.columns},
+                                index=pd.RangeIndex(self.n_rows)[start:stop]).astype(self.dtypes)
+        with self._lock:
+            if self._frame is None:
+                self._frame = pd.DataFrame({column: self.column(column) for column in self.columns}).astype(self.dtypes)
+            return self._frame
+
+    # Same shape as dataset_view.dataset_summary(), computed from the running aggregates
+    def summary(self, target=TARGET):
+        import pandas as pd
+
+        aggregates = self.aggregates
+        count = aggregates["count"] if aggregates else 0
+        std = np.sqrt(aggregates["m2"] / (count - 1)) if count > 1 else np.full(len(self.columns), np.nan)
+        summary = {
+            "rows": count,
+            "columns": len(self.columns),
+            "statistics": pd.DataFrame({"mean": aggregates["mean"], "std": std, "min": aggregates["min"], "max": aggregates["max"]},
+                                       index=self.columns) if aggregates else pd.DataFrame(),
+        }
+        if aggregates and target in self.columns:
+            counts = pd.Series(aggregates["classes"], name="children").sort_index()
+            counts.index = counts.index.astype(self.dtypes.get(target, np.float64))
+            summary["class_balance"] = counts.to_frame("children").assign(share=counts / counts.sum())
+        return summary
+
+
+# Append-only, in-memory store of dataset rows. Rows go into preallocated
+# buffers (compact feature rows, float64 for the rest) that double their capacity when full (amortized O(1) per row,
+# no reload of earlier rows); aggregates are updated from each new block
+# only. Writers serialize on a lock and publish a new Snapshot with a single
+# reference assignment, so readers never lock and never see a half-appended
+# batch. A store can follow a CSV file: refresh() parses only the bytes
+# appended since the last read.
+class IngestionStore:
+    def __init__(self, columns, dtypes=None, capacity=1024, target=TARGET):
+        check_schema(columns, list(columns))
+        missing = [column for column in FEATURE_COLUMNS + [target] if column not in columns]
+        if missing:
+            raise SchemaError(f"The dataset is missing required columns {missing}")
+        self.columns = list(columns)
+        self.dtypes = dict(dtypes or {column: np.float64 for column in self.columns})
+        self.target = target
+        self._target_index = self.columns.index(target)
+        self._other_index = [i for i, column in enumerate(self.columns) if column not in FEATURE_COLUMNS]
+        self._feature_index = [self.columns.index(column) for column in FEATURE_COLUMNS]
+        self._features = CompactMatrix.empty(capacity)
+        self._other = np.empty((capacity, len(self._other_index)), dtype=np.float64)
+        self._write_lock = threading.Lock()
+        self._snapshot = Snapshot(self.columns, self.dtypes, self._features[:0], self._other[:0], None, 0)
+        self.appends = 0
+        self.grows = 0
+        self.reloads = 0
+        self.rejected_rows = 0
+        # Like FileCache: refreshes served from memory vs ones that read the CSV
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+        # CSV being followed: path, consumed byte offset, hash of the bytes before it
+        self._source = None
+
+    def snapshot(self):
+        return self._snapshot
+
+    def _as_block(self, rows):
+        try:
+            if hasattr(rows, "columns"):
+                check_schema(rows.columns, self.columns)
+                rows = rows[self.columns]
+                if any(dtype.kind not in "biuf" for dtype in rows.dtypes):
+                    import pandas as pd
+
+                    # Non-numeric values (e.g. a repeated header line) become NaN, their rows are rejected below
+                    rows = rows.apply(pd.to_numeric, errors="coerce")
+                rows = rows.to_numpy(dtype=np.float64)
+            block = np.asarray(rows, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            if isinstance(e, SchemaError):
+                raise
+            raise SchemaError(f"Rows contain non-numeric values: {e}") from None
+        if block.ndim != 2 or block.shape[1] != len(self.columns):
+            raise SchemaError(f"Expected rows of {len(self.columns)} values, got shape {block.shape}")
+        # Rows breaking the form's rules (see schema.py) or with a missing
+        # target or id are dropped and counted, the rest are stored
+        valid = SCHEMA.validate(block[:, self._feature_index]).valid & np.isfinite(block[:, self._other_index]).all(axis=1)
+        if not valid.all():
+            block = block[valid]
+        return block, CompactMatrix.from_array(block[:, self._feature_index]), int(len(valid) - valid.sum())
+
+    # Append rows (a DataFrame with the store's columns, or an array in column
+    # order), skipping invalid ones; returns the new snapshot
+    def append(self, rows):
+        block, features, rejected = self._as_block(rows)
+        with self._write_lock:
+            return self._append_block(block, features, rejected)
+
+    def _append_block(self, block, features, rejected=0):
+        self.rejected_rows += rejected
+        current = self._snapshot
+        n_rows, n_new = current.n_rows, len(block)
+        if not n_new:
+            return current
+        if n_rows + n_new > len(self._other):
+            capacity = max(2 * len(self._other), n_rows + n_new)
+            grown = CompactMatrix.empty(capacity)
+            grown.data[:n_rows] = self._features.data[:n_rows]
+            other = np.empty((capacity, len(self._other_index)), dtype=np.float64)
+            other[:n_rows] = self._other[:n_rows]
+            self._features, self._other = grown, other
+            self.grows += 1
+        end = n_rows + n_new
+        self._features.data[n_rows:end] = features.data
+        self._other[n_rows:end] = block[:, self._other_index]
+        published = self._features[:end], self._other[:end]
+        for part in (published[0].data, published[1]):
+            part.flags.writeable = False
+        aggregates = _merge_aggregates(current.aggregates, _block_aggregates(block, self._target_index))
+        self._snapshot = Snapshot(self.columns, self.dtypes, *published, aggregates, current.version + 1)
+        self.appends += 1
+        return self._snapshot
+
+    # Start a store from a CSV file and keep following it. The initial rows
+    # come from the memory-mapped columnar copy (see columnar.py) when it is up
+    # to date with the CSV, else the CSV is parsed up to its last complete line.
+    @classmethod
+    def from_csv(cls, path, target=TARGET):
+        import pandas as pd
+
+        from columnar import is_fresh, load_columns, read_manifest
+
+        start = time.perf_counter()
+        manifest = read_manifest(path)
+        with open(path, "rb") as f:
+            if manifest is not None and is_fresh(path, manifest):
+                end = manifest["source_size"]
+                f.seek(max(0, end - _TAIL_CHECK))
+                tail = f.read(min(end, _TAIL_CHECK))
+                # A copy made from a CSV without a final newline is parsed instead,
+                # the last line may still be growing
+                df = pd.DataFrame(load_columns(path, manifest), copy=False) if tail.endswith(b"\n") else None
+            else:
+                df = None
+            if df is None:
+                f.seek(0)
+                content = f.read()
+                end = content.rfind(b"\n") + 1
+                tail = content[max(0, end - _TAIL_CHECK):end]
+                df = pd.read_csv(io.BytesIO(content[:end]))
+        store = cls(list(df.columns), df.dtypes.to_dict(), capacity=max(1024, 2 * len(df)), target=target)
+        store.append(df)
+        store._source = (os.path.abspath(path), end, hashlib.blake2b(tail).digest())
+        store.misses += 1
+        store.load_seconds += time.perf_counter() - start
+        return store
+
+    # Pick up rows appended to the followed CSV since the last read. Only the
+    # new bytes are parsed; an incomplete last line waits for the next call.
+    # Lines that are not valid rows are rejected and counted, never retried.
+    # If the file shrank or its consumed part changed, everything is reloaded.
+    def refresh(self):
+        import pandas as pd
+
+        if self._source is None:
+            return self._snapshot
+        with self._write_lock:
+            path, offset, tail_hash = self._source
+            size = os.stat(path).st_size
+            if size == offset:
+                self.hits += 1
+                return self._snapshot
+            start = time.perf_counter()
+            with open(path, "rb") as f:
+                f.seek(max(0, offset - _TAIL_CHECK))
+                tail = f.read(min(offset, _TAIL_CHECK))
+                content = f.read() if size > offset else b""
+            if size < offset or hashlib.blake2b(tail).digest() != tail_hash:
+                return self._reload(path)
+            end = content.rfind(b"\n") + 1
+            if not end:
+                self.hits += 1
+                return self._snapshot
+            lines = content[:end]
+            df = pd.read_csv(io.BytesIO(lines), header=None, names=self.columns, on_bad_lines="skip")
+            # Lines with too many fields are skipped by the parser; they count as rejected rows
+            skipped = sum(1 for line in lines.splitlines() if line.strip()) - len(df)
+            block, features, rejected = self._as_block(df)
+            snapshot = self._append_block(block, features, rejected + skipped)
+            new_tail = (tail + content[:end])[-_TAIL_CHECK:]
+            self._source = (path, offset + end, hashlib.blake2b(new_tail).digest())
+            self.misses += 1
+            self.load_seconds += time.perf_counter() - start
+            return snapshot
+
+    # The followed file was rewritten: adopt a freshly read copy, keeping the version counting up
+    def _reload(self, path):
+        fresh = IngestionStore.from_csv(path, self.target)
+        snapshot = fresh._snapshot
+        for name in ("columns", "dtypes", "_target_index", "_other_index", "_feature_index", "_features", "_other", "_source"):
+            setattr(self, name, getattr(fresh, name))
+        self._snapshot = Snapshot(self.columns, self.dtypes, snapshot.features(), snapshot.other, snapshot.aggregates,
+                                  self._snapshot.version + 1)
+        self.reloads += 1
+        self.rejected_rows += fresh.rejected_rows
+        self.misses += 1
+        self.load_seconds += fresh.load_seconds
+        return self._snapshot
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "rows": snapshot.n_rows,
+            "capacity": len(self._other),
+            "bytes": snapshot.nbytes,
+            "version": snapshot.version,
+            "appends": self.appends,
+            "grows": self.grows,
+            "reloads": self.reloads,
+            "rejected_rows": self.rejected_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "load_seconds": self.load_seconds,
+        }
+
+
+if __name__ == "__main__":
+    import shutil
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Time appending rows to a followed CSV against re-reading it.")
+    parser.add_argument("--data", default=os.path.join(current_dir, "data", "mortality_data.csv"))
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-rows", type=int, default=100)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, os.path.basename(args.data))
+        shutil.copyfile(args.data, path)
+        with open(args.data, "rb") as f:
+            rows = f.read().splitlines(keepends=True)[1:]
+        store = IngestionStore.from_csv(path)
+        refresh_ms, reread_ms = [], []
+        for i in range(args.batches):
+            with open(path, "ab") as f:
+                f.writelines(rows[i * args.batch_rows % len(rows):][:args.batch_rows])
+            start = time.perf_counter()
+            snapshot = store.refresh()
+            refresh_ms.append((time.perf_counter() - start) * 1e3)
+            start = time.perf_counter()
+            df = pd.read_csv(path)
+            reread_ms.append((time.perf_counter() - start) * 1e3)
+
+        assert snapshot.n_rows == len(df)
+        balance = snapshot.summary()["class_balance"]
+        print(f"{snapshot.n_rows:,} rows after {args.batches} appends of {args.batch_rows}: "
+              f"refresh p50 {np.median(refresh_ms):.1f}ms, full re-read p50 {np.median(reread_ms):.1f}ms")
+        print(f"Class balance: {balance['children'].to_dict()}")
+        print(store.stats())
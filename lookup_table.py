@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+from compiled import CompiledEnsemble, compile_model
+from features import CATEGORICAL_QUESTIONS, ENCODER, FEATURE_COLUMNS, NUMERIC_QUESTIONS, random_answers
+
+
+# Precomputed answer tables for the whole form.
+# The trees only ever compare a feature against their split thresholds, so two
+# inputs that fall into the same threshold interval on every feature reach the
+# same leaves. Each dimension of the answer space is either a selectbox
+# question (its options, merged when they only differ on columns the model
+# never splits on) or a numeric feature (the intervals between its split
+# thresholds). The full product of all dimensions is far too large for a real
+# model (about 3e10 cells for the 1000-tree pipeline), but a depth-3 tree only
+# splits on a handful of dimensions. Trees are therefore grouped by the
+# dimensions they split on, and each group gets a small table of its trees'
+# summed leaf values over just those dimensions (about 1.2e5 cells in all for
+# the 1000-tree pipeline). A lookup digitizes a row once per dimension, reads
+# one cell per group and adds the group sums, independent of the number of
+# estimators. Labels match the ensemble's; the decision sums only differ in
+# the order the trees are added.
+class LookupTable:
+    def __init__(self, dims, groups, values, classes, total_weight):
+        self.dims = dims
+        self.groups = groups
+        self.values = values
+        self.classes_ = np.asarray(classes)
+        self.total_weight = float(total_weight)
+        self._prepare()
+
+    def _prepare(self):
+        for dim in self.dims:
+            if dim["kind"] == "categorical":
+                # Bit pattern of the used one-hot columns -> digit, -1 for impossible patterns
+                codes = np.full(2 ** len(dim["columns"]), -1, dtype=np.int64)
+                for digit, pattern in enumerate(dim["patterns"]):
+                    codes[int(np.dot(pattern, 2 ** np.arange(len(pattern))))] = digit
+                dim["codes"] = codes
+                dim["indices"] = np.array([FEATURE_COLUMNS.index(c) for c in dim["columns"]], dtype=np.intp)
+                dim["code_list"] = codes.tolist()
+                dim["index_list"] = dim["indices"].tolist()
+            else:
+                dim["index"] = FEATURE_COLUMNS.index(dim["column"])
+                dim["cuts"] = np.asarray(dim["thresholds"], dtype=np.float64)
+
+        # strides[d, g]: weight of dimension d's digit in group g's cell index (0 when g does not use d)
+        self.strides = np.zeros((len(self.dims), len(self.groups)), dtype=np.int64)
+        sizes = []
+        for g, group in enumerate(self.groups):
+            stride = 1
+            for d in reversed(group):
+                self.strides[d, g] = stride
+                stride *= self.dims[d]["size"]
+            sizes.append(stride)
+        self.offsets = np.cumsum([0] + sizes[:-1]).astype(np.int64)
+
+    @property
+    def n_cells(self):
+        return len(self.values)
+
+    # Digit of every row on every dimension, -1 where a row's dummies of a
+    # question match none of its patterns (two options set)
+    def digits(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        digits = np.empty((len(X), len(self.dims)), dtype=np.int64)
+        for d, dim in enumerate(self.dims):
+            if dim["kind"] == "categorical":
+                bits = X[:, dim["indices"]] > 0.5
+                digits[:, d] = dim["codes"][bits.astype(np.int64) @ (2 ** np.arange(len(dim["indices"])))]
+            else:
+                # Number of thresholds strictly below the value, compared in float32 like the trees
+                value = X[:, dim["index"]].astype(np.float32).astype(np.float64)
+                digits[:, d] = np.searchsorted(dim["cuts"], value, side="left")
+        return digits
+
+    # Same arithmetic as CompiledEnsemble._decision_block on the summed group values
+    def _decision(self, pred):
+        pred /= self.total_weight
+        if len(self.classes_) == 2:
+            pred[..., 0] *= -1
+            return pred.sum(axis=-1)
+        return pred
+
+    def _labels(self, decision):
+        if len(self.classes_) == 2:
+            return self.classes_.take(decision > 0, axis=0)
+        return self.classes_.take(np.argmax(decision, axis=-1), axis=0)
+
+    def decision_function(self, X, block_size=4096):
+        digits = self.digits(X)
+        if (digits < 0).any():
+            questions = [self.dims[d]["name"] for d in np.flatnonzero((digits < 0).any(axis=0))]
+            raise ValueError(f"{int((digits < 0).any(axis=1).sum())} rows set a combination of options the table has "
+                             f"no cells for (more than one option of {', '.join(questions)})")
+        decision = []
+        for start in range(0, len(digits), block_size):
+            cells = digits[start:start + block_size] @ self.strides + self.offsets
+            decision.append(self._decision(self.values.take(cells, axis=0).sum(axis=1)))
+        return np.concatenate(decision) if decision else np.zeros(0)
+
+    def predict(self, X):
+        return self._labels(self.decision_function(X))
+
+    # Scalar path for a single form submission, avoids per-dimension NumPy overhead
+    def predict_one(self, row):
+        row = np.asarray(row, dtype=np.float64).ravel().tolist()
+        digits = []
+        for dim in self.dims:
+            if dim["kind"] == "categorical":
+                code = sum(1 << k for k, i in enumerate(dim["index_list"]) if row[i] > 0.5)
+                digit = dim["code_list"][code]
+                if digit < 0:
+                    raise ValueError(f"Row sets a combination of options of question {dim['name']!r} "
+                                     f"the table has no cells for (more than one option)")
+            else:
+                digit = bisect_left(dim["thresholds"], float(np.float32(row[dim["index"]])))
+            digits.append(digit)
+        cells = np.asarray(digits, dtype=np.int64) @ self.strides + self.offsets
+        return self._labels(self._decision(self.values.take(cells, axis=0).sum(axis=0)))
+
+    def save(self, path):
+        meta = [{key: dim[key] for key in ("kind", "name", "size", "columns", "patterns", "column", "thresholds", "values") if key in dim}
+                for dim in self.dims]
+        np.savez(path, values=self.values, classes=self.classes_, total_weight=self.total_weight,
+                 dims=np.array(json.dumps(meta)), groups=np.array(json.dumps(self.groups)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(json.loads(str(data["dims"])), json.loads(str(data["groups"])), data["values"], data["classes"],
+                       float(data["total_weight"]))
+
+
+# Largest float32 value v with float32(v) <= threshold, i.e. a value the trees send left
+def _float32_at_or_below(threshold):
+    value = np.float32(threshold)
+    if value > threshold:
+        value = np.nextafter(value, np.float32(-np.inf))
+    return float(value)
+
+
+def _float32_above(threshold):
+    value = np.float32(threshold)
+    while value <= threshold:
+        value = np.nextafter(value, np.float32(np.inf))
+    return float(value)
+
+
+# Split thresholds the compiled ensemble uses, per feature column
+def model_thresholds(compiled):
+    internal = compiled.left != np.arange(len(compiled.left))
+    thresholds = {}
+    for feature, threshold in zip(compiled.feature[internal], compiled.threshold[internal]):
+        thresholds.setdefault(FEATURE_COLUMNS[feature], set()).add(float(threshold))
+    return {column: sorted(values) for column, values in thresholds.items()}
+
+
+def _table_dims(thresholds):
+    dims = []
+    for question, options in CATEGORICAL_QUESTIONS.items():
+        columns = [c for c in dict.fromkeys(options.values()) if c is not None and c in thresholds]
+        if not columns:
+            continue
+        for column in columns:
+            if not all(0.0 < t < 1.0 for t in thresholds[column]):
+                raise ValueError(f"Dummy column {column!r} is split outside (0, 1): {thresholds[column]}")
+        patterns = list(dict.fromkeys(tuple(int(options[o] == c) for c in columns) for o in options))
+        # No option set is a valid row too (SCHEMA accepts it, the trees score
+        # it), also for questions without a baseline option such as child_size
+        patterns = list(dict.fromkeys(patterns + [(0,) * len(columns)]))
+        dims.append({"kind": "categorical", "name": question, "size": len(patterns),
+                     "columns": columns, "patterns": [list(p) for p in patterns]})
+    for column in NUMERIC_QUESTIONS:
+        if column not in thresholds:
+            continue
+        cuts = thresholds[column]
+        values = [_float32_at_or_below(t) for t in cuts] + [_float32_above(cuts[-1])]
+        dims.append({"kind": "numeric", "name": column, "size": len(values),
+                     "column": column, "thresholds": cuts, "values": values})
+    return dims
+
+
+# Dimensions (indices into dims) each tree of the compiled ensemble splits on
+def _tree_dims(compiled, dims):
+    dim_of = {}
+    for d, dim in enumerate(dims):
+        for column in dim["columns"] if dim["kind"] == "categorical" else [dim["column"]]:
+            dim_of[FEATURE_COLUMNS.index(column)] = d
+    ends = np.append(compiled.roots[1:], len(compiled.feature))
+    tree_dims = []
+    for root, end in zip(compiled.roots, ends):
+        nodes = np.arange(root, end)
+        internal = compiled.left[nodes] != nodes
+        tree_dims.append(frozenset(dim_of[f] for f in compiled.feature[nodes][internal].tolist()))
+    return tree_dims
+
+
+# Trees grouped by the dimensions they split on; a tree whose dimensions are a
+# subset of a larger group's joins that group for free. Returns (dims, trees) pairs.
+def _group_trees(tree_dims, dims):
+    def size(dim_set):
+        return int(np.prod([dims[d]["size"] for d in dim_set], dtype=np.float64))
+
+    groups = []
+    for dim_set in sorted(set(tree_dims), key=lambda dim_set: (-size(dim_set), sorted(dim_set))):
+        for group in groups:
+            if dim_set <= group[0]:
+                break
+        else:
+            groups.append((dim_set, []))
+    for tree, dim_set in enumerate(tree_dims):
+        next(group for group in groups if dim_set <= group[0])[1].append(tree)
+    return [(sorted(dim_set), trees) for dim_set, trees in groups]
+
+
+# Build one table per tree group: enumerate the group's cells and score them
+# with only the group's trees of the compiled ensemble
+def build_lookup_table(model, max_cells=50_000_000, batch_size=65_536):
+    compiled = compile_model(model)
+    dims = _table_dims(model_thresholds(compiled))
+    groups = _group_trees(_tree_dims(compiled, dims), dims)
+    n_cells = sum(int(np.prod([dims[d]["size"] for d in group], dtype=np.float64)) for group, _ in groups)
+    if n_cells > max_cells:
+        raise ValueError(f"Tree groups need {n_cells:,} cells (over max_cells={max_cells:,}) for {len(groups)} groups")
+
+    table = LookupTable(dims, [group for group, _ in groups], np.zeros((n_cells, compiled.n_classes_)),
+                        compiled.classes_, compiled.total_weight)
+    for g, (group, trees) in enumerate(groups):
+        sub = CompiledEnsemble(compiled.feature, compiled.threshold, compiled.left, compiled.right, compiled.roots[trees],
+                               compiled.leaf_values, compiled.classes_, compiled.total_weight, compiled.max_depth,
+                               compiled.n_features_in_)
+        size = int(np.prod([dims[d]["size"] for d in group], dtype=np.float64))
+        for start in range(0, size, batch_size):
+            index = np.arange(start, min(start + batch_size, size), dtype=np.int64)
+            # Columns outside the group's dimensions stay 0, none of its trees split on them
+            X = np.zeros((len(index), len(FEATURE_COLUMNS)), dtype=np.float64)
+            for d in group:
+                dim = dims[d]
+                digit = (index // table.strides[d, g]) % dim["size"]
+                if dim["kind"] == "categorical":
+                    X[:, dim["indices"]] = np.asarray(dim["patterns"], dtype=np.float64)[digit]
+                else:
+                    X[:, dim["index"]] = np.asarray(dim["values"])[digit]
+            table.values[table.offsets[g] + index] = compiled.leaf_values.take(sub._leaves(X), axis=0).sum(axis=0)
+    return table
+
+
+# Compare table lookups with model.predict on sampled form answers (or X) and
+# the rows of `data`, e.g. the dataset's features; returns the number of mismatching rows
+def verify_lookup_table(table, model, n_samples=10_000, random_state=0, X=None, data=None):
+    if X is None:
+        X = ENCODER.encode_columns(random_answers(np.random.default_rng(random_state), n_samples))
+    if data is not None:
+        X = np.vstack([X, np.asarray(data, dtype=np.float64)])
+    return int((table.predict(X) != model.predict(X)).sum())
+
+
+if __name__ == "__main__":
+    import pickle
+
+    import pandas as pd
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Precompute the form answer table for a model and verify it.")
+    parser.add_argument("--model", default=os.path.join(current_dir, "adaboost2.pkl"))
+    parser.add_argument("--output", default=None, help="where to save the table (default: <model>.table.npz)")
+    parser.add_argument("--max-cells", type=int, default=50_000_000)
+    parser.add_argument("--verify-samples", type=int, default=10_000)
+    parser.add_argument("--data", default=os.path.join(current_dir, "data", "mortality_data.csv"),
+                        help="dataset whose rows are verified too")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    start = time.perf_counter()
+    table = build_lookup_table(model, max_cells=args.max_cells)
+    print(f"Built {table.n_cells:,} cells in {len(table.groups)} tree groups over {len(table.dims)} dimensions "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    data = pd.read_csv(args.data)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    n_checked = args.verify_samples + len(data)
+    mismatches = verify_lookup_table(table, model, n_samples=args.verify_samples, data=data)
+    if mismatches:
+        raise SystemExit(f"{mismatches} of {n_checked} sampled inputs and dataset rows disagree with model.predict")
+    print(f"All {args.verify_samples} sampled inputs and {len(data)} dataset rows match model.predict")
+
+    output = args.output or os.path.splitext(args.model)[0] + ".table.npz"
+    table.save(output)
+    print(f"Saved to {output}")
@@ -0,0 +1,191 @@
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds, Prometheus' defaults extended down to 0.5ms
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Where the app writes its metrics for a local scraper (e.g. node_exporter's
+# textfile collector); exporting is off when the variable is not set
+METRICS_FILE_ENV = "MORTALITY_METRICS_FILE"
+
+# The process umask, read once at import: os.umask() can only be read by
+# setting it, which would race with files other threads create later
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+# Process-wide counters and per-stage latency histograms, exported in the
+# Prometheus text format. Recording is a lock, a bisect and a few additions,
+# cheap enough for every rerun. Collectors add the stats dicts of other
+# components (caches, executor) as gauges at export time.
+class Metrics:
+    def __init__(self, namespace="mortality", buckets=DEFAULT_BUCKETS, export_interval=1.0):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = {}
+        self._export_lock = threading.Lock()
+        self._last_export = 0.0
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, stage, seconds):
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            histogram["counts"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # func() returns a stats dict; its numeric values are exported as <namespace>_<prefix>_<key> gauges
+    def add_collector(self, prefix, func):
+        with self._lock:
+            self._collectors[prefix] = func
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {stage: {"counts": list(h["counts"]), "sum": h["sum"], "count": h["count"]}
+                               for stage, h in self._histograms.items()},
+            }
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        with self._lock:
+            collectors = dict(self._collectors)
+        ns = self.namespace
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE {ns}_{name} counter", f"{ns}_{name} {value}"]
+
+        if snapshot["histograms"]:
+            lines += [f"# HELP {ns}_stage_seconds Time spent in each stage of a script run.",
+                      f"# TYPE {ns}_stage_seconds histogram"]
+        for stage, histogram in sorted(snapshot["histograms"].items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]!r}')
+            lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        for prefix, func in sorted(collectors.items()):
+            try:
+                stats = func()
+            except Exception:
+                continue
+            for key, value in sorted(stats.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines += [f"# TYPE {ns}_{prefix}_{key} gauge", f"{ns}_{prefix}_{key} {value!r}"]
+        return "\n".join(lines) + "\n"
+
+    # Replace the file atomically so a scraper never reads a partial export;
+    # the temporary file is unique, so concurrent writers never share it.
+    # mkstemp creates it 0600, it gets the mode open() would give instead so
+    # a collector running as another user (node_exporter) can read it.
+    def write_prometheus(self, path):
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                        dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.prometheus_text())
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    # Write to $MORTALITY_METRICS_FILE at most once per export_interval. One
+    # thread exports at a time, the others skip instead of waiting; a failed
+    # write is counted and never raised into the script run.
+    def maybe_export(self, path=None):
+        path = path or os.environ.get(METRICS_FILE_ENV)
+        if not path or not self._export_lock.acquire(blocking=False):
+            return False
+        try:
+            now = time.monotonic()
+            if now - self._last_export < self.export_interval:
+                return False
+            self._last_export = now
+            self.write_prometheus(path)
+            return True
+        except OSError:
+            self.inc("metrics_export_errors_total")
+            return False
+        finally:
+            self._export_lock.release()
+
+
+# Shared by every session in the process
+METRICS = Metrics()
+
+
+# Stage timings of one script run. Each stage goes into the process-wide
+# histograms and into this run's entry in the session's recent-run history,
+# which is added at the start, so early returns still leave their timings.
+class RunTimer:
+    def __init__(self, history=None, metrics=METRICS):
+        self.metrics = metrics
+        self.timings = {"started": time.strftime("%H:%M:%S")}
+        if history is not None:
+            history.append(self.timings)
+        metrics.inc("reruns_total")
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[f"{name}_ms"] = round(elapsed * 1e3, 3)
+            self.metrics.observe(name, elapsed)
+            self.metrics.maybe_export()
+
+
+# Start timing a rerun, keeping the last `keep` runs of the session in session_state
+def start_run(session_state, keep=20, key="stage_timings"):
+    history = session_state.get(key)
+    if history is None or history.maxlen != keep:
+        history = session_state[key] = deque(history or (), maxlen=keep)
+    return RunTimer(history)
+
+
+# Debug panel with the session's recent stage timings and the process-wide
+# histogram totals; streamlit is only imported when the panel is shown
+def render_debug_panel(session_state, key="stage_timings"):
+    import streamlit as st
+
+    with st.expander("Debug: stage timings"):
+        history = list(session_state.get(key) or ())
+        st.write(f"Last {len(history)} runs of this session (milliseconds):")
+        st.dataframe(history[::-1])
+        snapshot = METRICS.snapshot()
+        st.write("All sessions in this process:")
+        st.dataframe([{"stage": stage, "runs": h["count"], "mean_ms": h["sum"] / h["count"] * 1e3}
+                      for stage, h in sorted(snapshot["histograms"].items())])
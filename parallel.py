@@ -0,0 +1,84 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from resources import load_model
+
+
+# Model loaded once per worker process by the pool initializer, never per task
+_worker_model = None
+
+
+def _init_worker(model_path):
+    global _worker_model
+    _worker_model = load_model(model_path)
+
+
+def _predict_shard(shard):
+    return _worker_model.predict(shard)
+
+
+def _predict_proba_shard(shard):
+    return _worker_model.predict_proba(shard)
+
+
+def _predict_with_proba_shard(shard):
+    if hasattr(_worker_model, "predict_with_proba"):
+        return _worker_model.predict_with_proba(shard)
+    return _worker_model.predict(shard), _worker_model.predict_proba(shard)
+
+
+# Scores large feature matrices across a process pool. The matrix is split into
+# shards of shard_size rows, the shards are scored by the workers, and results
+# are reassembled in input order. Exposes predict/predict_proba/
+# predict_with_proba/classes_ so it
+# can stand in for the model in batch_score.
+class ParallelScorer:
+    def __init__(self, model_path, n_workers=None, shard_size=10_000, mp_context=None):
+        self.model_path = model_path
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        model = load_model(model_path)
+        self.classes_ = getattr(model, "classes_", None)
+        if self.classes_ is None and hasattr(model, "steps"):
+            self.classes_ = getattr(model.steps[-1][1], "classes_", None)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(model_path,),
+        )
+
+    def _shards(self, X):
+        X = np.asarray(X)
+        return [X[start:start + self.shard_size] for start in range(0, len(X), self.shard_size)]
+
+    def predict(self, X):
+        shards = self._shards(X)
+        if not shards:
+            return np.empty(0)
+        return np.concatenate(list(self._executor.map(_predict_shard, shards)))
+
+    def predict_proba(self, X):
+        shards = self._shards(X)
+        if not shards:
+            return np.empty((0, 0 if self.classes_ is None else len(self.classes_)))
+        return np.concatenate(list(self._executor.map(_predict_proba_shard, shards)))
+
+    # Labels and probabilities from one pass over the shards
+    def predict_with_proba(self, X):
+        shards = self._shards(X)
+        if not shards:
+            return self.predict(X), self.predict_proba(X)
+        labels, proba = zip(*self._executor.map(_predict_with_proba_shard, shards))
+        return np.concatenate(labels), np.concatenate(proba)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
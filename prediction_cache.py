@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import METRICS
+from scoring import predict_one
+
+
+# LRU + TTL cache of predictions keyed by a hash of the encoded feature vector.
+# Entries belong to one model fingerprint; seeing a different fingerprint (a
+# model swap) drops every entry, so stale labels are never served.
+class PredictionCache:
+    def __init__(self, maxsize=4096, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(row):
+        row = np.ascontiguousarray(row, dtype=np.float64).ravel()
+        return hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+    def _check_fingerprint(self, fingerprint):
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, row, fingerprint):
+        key = self.key(row)
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, row, fingerprint, prediction):
+        key = self.key(row)
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            self._entries[key] = (prediction, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Predict one encoded row, calling predictor(model, row) only on a cache miss
+    def predict(self, model, row, fingerprint=None, predictor=predict_one):
+        if fingerprint is None:
+            fingerprint = id(model)
+        prediction = self.get(row, fingerprint)
+        if prediction is None:
+            prediction = predictor(model, row)
+            self.put(row, fingerprint, prediction)
+        return prediction
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared by every session in the process
+PREDICTION_CACHE = PredictionCache()
+METRICS.add_collector("prediction_cache", PREDICTION_CACHE.stats)
@@ -0,0 +1,242 @@
+import argparse
+import glob
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from compiled import EXPORT_META, CompiledEnsemble, is_export, matching_export
+from features import FEATURE_COLUMNS
+from metrics import METRICS
+from scoring import n_features_in
+
+
+# Map a NumPy export (see compiled.py); fingerprinted over all of its files
+def _load_export(path):
+    digest = hashlib.sha256()
+    file_bytes = 0
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), "rb") as f:
+            content = f.read()
+        digest.update(name.encode() + content)
+        file_bytes += len(content)
+    start = time.perf_counter()
+    model = CompiledEnsemble.load(path)
+    load_seconds = time.perf_counter() - start
+    info = {
+        "name": os.path.basename(path),
+        "path": os.path.abspath(path),
+        "sha256": digest.hexdigest(),
+        "mtime_ns": os.stat(os.path.join(path, EXPORT_META)).st_mtime_ns,
+        "file_bytes": file_bytes,
+        "load_seconds": load_seconds,
+        "cold_load_seconds": load_seconds,
+        # Node arrays are memory-mapped, only the children index is built in memory
+        "memory_bytes": model._children.nbytes,
+        "n_features": model.n_features_in_,
+    }
+    return model, info
+
+
+# Unpickle a model file once, timing the load. With profile=True (discover()
+# and the CLI) it also measures the cold load and the memory: the first model
+# of a kind imports sklearn/imblearn, so that cold load is reported separately
+# and the model is timed again without the imports, and the memory is traced
+# on a separate copy since tracing slows unpickling down.
+# A pickle with an up-to-date export next to it is served from the export, so
+# sklearn and imblearn are never imported; it keeps the pickle's identity.
+def _load(path, profile=False):
+    if is_export(path):
+        return _load_export(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+    export = matching_export(path, sha256)
+    if export is not None:
+        model, info = _load_export(export)
+        info.update(name=os.path.basename(path), path=os.path.abspath(path), sha256=sha256,
+                    mtime_ns=os.stat(path).st_mtime_ns, export=os.path.abspath(export))
+        return model, info
+    n_modules = len(sys.modules)
+    start = time.perf_counter()
+    model = pickle.loads(content)
+    cold_load_seconds = load_seconds = time.perf_counter() - start
+    memory_bytes = None
+    if profile:
+        if len(sys.modules) > n_modules:
+            start = time.perf_counter()
+            model = pickle.loads(content)
+            load_seconds = time.perf_counter() - start
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            copy = pickle.loads(content)
+            memory_bytes = tracemalloc.get_traced_memory()[0] - before
+            del copy
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+    stat = os.stat(path)
+    info = {
+        "name": os.path.basename(path),
+        "path": os.path.abspath(path),
+        "sha256": sha256,
+        "mtime_ns": stat.st_mtime_ns,
+        "file_bytes": len(content),
+        "load_seconds": load_seconds,
+        "cold_load_seconds": cold_load_seconds,
+        "memory_bytes": memory_bytes,
+        "n_features": n_features_in(model),
+    }
+    return model, info
+
+
+# Finds pickled models in a directory, fingerprints and validates them, and
+# holds the active model. Activation loads, validates and warms up the new
+# model completely before swapping it in with a single reference assignment,
+# so requests keep using the previous model until the new one is ready.
+# Activations are serialised, and each one re-checks the file against the
+# active model first, so sessions that notice the same change together load
+# the new version once.
+class ModelRegistry:
+    def __init__(self, directory, n_features=len(FEATURE_COLUMNS)):
+        self.directory = directory
+        self.n_features = n_features
+        self._lock = threading.Lock()
+        self._activate_lock = threading.Lock()
+        self._active = None
+        self._known = {}
+        # Calls served by the active model vs calls that loaded one, like FileCache
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.load_seconds = 0.0
+
+    def _validate(self, model, info):
+        if not hasattr(model, "predict"):
+            return f"{type(model).__name__} has no predict()"
+        if info["n_features"] is None:
+            return "model is not fitted"
+        if info["n_features"] != self.n_features:
+            return f"model expects {info['n_features']} features, the form produces {self.n_features}"
+        return None
+
+    # Every *.pkl and *.arrays export in the directory with its fingerprint, size, load time, memory and validity
+    def discover(self):
+        models = []
+        directory = os.path.abspath(self.directory)
+        for path in sorted(glob.glob(os.path.join(directory, "*.pkl")) + glob.glob(os.path.join(directory, "*.arrays"))):
+            stat = os.stat(os.path.join(path, EXPORT_META) if is_export(path) else path)
+            known = self._known.get(path)
+            if known is None or known["mtime_ns"] != stat.st_mtime_ns:
+                try:
+                    model, info = _load(path, profile=True)
+                    info["error"] = self._validate(model, info)
+                except Exception as e:
+                    info = {"name": os.path.basename(path), "path": os.path.abspath(path), "mtime_ns": stat.st_mtime_ns,
+                            "error": f"could not load: {e}"}
+                known = self._known[path] = info
+            models.append(dict(known, valid=known["error"] is None))
+        return models
+
+    # True if the active model was loaded from the current content of path
+    def _is_current(self, active, path):
+        if active is None or active[0]["path"] != os.path.abspath(path):
+            return False
+        stat_path = os.path.join(path, EXPORT_META) if is_export(path) else path
+        if os.stat(stat_path).st_mtime_ns == active[0]["mtime_ns"]:
+            return True
+        if not is_export(path):
+            with open(path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() == active[0]["sha256"]:
+                    active[0]["mtime_ns"] = os.stat(path).st_mtime_ns
+                    return True
+        return False
+
+    def activate(self, name_or_path):
+        path = name_or_path if os.path.dirname(name_or_path) else os.path.join(self.directory, name_or_path)
+        with self._activate_lock:
+            # Another thread may have activated this version while we waited
+            active = self._active
+            if self._is_current(active, path):
+                with self._lock:
+                    self.hits += 1
+                return active[0]
+            model, info = _load(path)
+            error = self._validate(model, info)
+            if error:
+                raise ValueError(f"Cannot activate {info['name']}: {error}")
+            # Warm up before the swap so the first real request doesn't pay for it
+            start = time.perf_counter()
+            model.predict(np.zeros((1, self.n_features)))
+            info["warmup_seconds"] = time.perf_counter() - start
+            info["activated_at"] = time.time()
+            with self._lock:
+                self._active = (info, model)
+                self.misses += 1
+                if active is not None and active[0]["path"] == info["path"]:
+                    self.reloads += 1
+                self.load_seconds += info["load_seconds"]
+            return info
+
+    # (info, model) of the active model, or None
+    def active(self):
+        return self._active
+
+    # Make path the active model, re-activating it if the file changed on disk
+    def ensure_active(self, path):
+        active = self._active
+        if self._is_current(active, path):
+            with self._lock:
+                self.hits += 1
+            return active
+        self.activate(path)
+        return self._active
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "load_seconds": self.load_seconds,
+            }
+
+    # Hot reload: swap in a new version of the active file in a background thread
+    def reload_in_background(self):
+        active = self._active
+        if active is None:
+            return None
+        thread = threading.Thread(target=self.ensure_active, args=(active[0]["path"],), daemon=True)
+        thread.start()
+        return thread
+
+
+# Shared by every session in the process
+REGISTRY = ModelRegistry(os.path.dirname(os.path.abspath(__file__)))
+METRICS.add_collector("model_registry", REGISTRY.stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the pickled models in a directory and check them against the form.")
+    parser.add_argument("directory", nargs="?", default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args()
+
+    for info in ModelRegistry(args.directory).discover():
+        status = "ok" if info["valid"] else info["error"]
+        if info.get("export"):
+            status += f" (served from {os.path.basename(info['export'])})"
+        if "sha256" in info:
+            print(f"{info['name']:<28} {info['sha256'][:12]}  {info['file_bytes'] / 1024:8.1f} KiB on disk  "
+                  f"{info['memory_bytes'] / 1024:8.1f} KiB in memory  {info['load_seconds'] * 1e3:7.1f} ms  {status}")
+        else:
+            print(f"{info['name']:<28} {status}")
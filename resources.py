@@ -0,0 +1,141 @@
+import hashlib
+import io
+import os
+import pickle
+import threading
+import time
+
+from compiled import EXPORT_META, CompiledEnsemble, is_export
+from ingest import IngestionStore
+from metrics import METRICS
+
+
+# Process-wide cache for files loaded by the app. Streamlit re-runs main() on
+# every widget change and in every session, but this module is imported once
+# per process, so everything cached here is shared between all sessions.
+# An entry is reloaded only when the file's mtime changes AND its content hash
+# differs from the cached one (a touch without edits keeps the cached object).
+class FileCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.load_seconds = 0.0
+
+    def get(self, path, loader):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                self.hits += 1
+                entry["hits"] += 1
+                return entry["value"]
+
+            with open(path, "rb") as f:
+                content = f.read()
+            sha256 = hashlib.sha256(content).hexdigest()
+            if entry is not None and entry["sha256"] == sha256:
+                # Same content under a new mtime, keep the loaded object
+                entry["mtime_ns"] = stat.st_mtime_ns
+                entry["size"] = stat.st_size
+                self.hits += 1
+                entry["hits"] += 1
+                return entry["value"]
+
+            start = time.perf_counter()
+            value = loader(io.BytesIO(content))
+            elapsed = time.perf_counter() - start
+
+            self.misses += 1
+            self.load_seconds += elapsed
+            if entry is not None:
+                self.reloads += 1
+            self._entries[path] = {
+                "value": value,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": sha256,
+                "load_seconds": elapsed,
+                "loaded_at": time.time(),
+                "loads": (entry["loads"] if entry is not None else 0) + 1,
+                "hits": entry["hits"] if entry is not None else 0,
+            }
+            return value
+
+    def fingerprint(self, path):
+        entry = self._entries.get(os.path.abspath(path))
+        return entry["sha256"] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "load_seconds": self.load_seconds,
+                "files": {
+                    path: {key: entry[key] for key in ("sha256", "load_seconds", "loaded_at", "loads", "hits")}
+                    for path, entry in self._entries.items()
+                },
+            }
+
+
+_cache = FileCache()
+METRICS.add_collector("file_cache", _cache.stats)
+
+
+# Append-only stores following dataset CSVs (see ingest.py), one per path
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+# Current snapshot of the mortality dataset. The dataset is loaded once per
+# process, memory-mapped from its columnar copy when that is up to date; later
+# calls only stat the CSV and parse rows appended since the previous call, so
+# new survey rows show up without re-reading the dataset.
+def load_mortality_snapshot(path):
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = IngestionStore.from_csv(path)
+            return store.snapshot()
+    return store.refresh()
+
+
+# Totals over the followed datasets (in practice the one mortality CSV), flat
+# so every value shows up in the metrics export
+def ingestion_stats():
+    with _stores_lock:
+        stores = list(_stores.values())
+    totals = {"datasets": len(stores)}
+    for store in stores:
+        for key, value in store.stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+METRICS.add_collector("ingestion", ingestion_stats)
+
+
+# Load the model once per process: a pickle, or a NumPy export directory
+# written by compiled.py, which loads without importing sklearn or imblearn
+def load_model(path):
+    if is_export(path):
+        return _cache.get(os.path.join(path, EXPORT_META), lambda f: CompiledEnsemble.load(path))
+    return _cache.get(path, pickle.load)
+
+
+def fingerprint(path):
+    return _cache.fingerprint(path)
+
+
+def cache_stats():
+    return _cache.stats()
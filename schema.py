@@ -0,0 +1,149 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from compact import CompactMatrix
+from features import CATEGORICAL_QUESTIONS, FEATURE_COLUMNS, NUMERIC_QUESTIONS, ORDERING_CONSTRAINTS
+
+
+# Result of Schema.validate(). The masks are kept rule-major: by_rule[k] marks
+# the rows breaking rules[k]; errors[i] is row i's mask over all the rules.
+class Validation:
+    def __init__(self, rules, by_rule):
+        self.rules = rules
+        self.by_rule = by_rule
+
+    @property
+    def errors(self):
+        return self.by_rule.T
+
+    @property
+    def valid(self):
+        return ~self.by_rule.any(axis=0)
+
+    @property
+    def n_invalid(self):
+        return int(self.by_rule.shape[1] - self.valid.sum())
+
+    # Number of rows breaking each rule, for the rules any row breaks
+    def rule_counts(self):
+        counts = self.by_rule.sum(axis=1)
+        return {self.rules[k]: int(counts[k]) for k in np.flatnonzero(counts)}
+
+    def row_errors(self, i):
+        return [self.rules[k] for k in np.flatnonzero(self.by_rule[:, i])]
+
+    # {row: [rule, ...]} for the first `limit` invalid rows
+    def invalid_rows(self, limit=None):
+        rows = np.flatnonzero(~self.valid)[:limit]
+        return {int(i): self.row_errors(i) for i in rows}
+
+
+# Checks on encoded feature rows that the form's widgets otherwise enforce:
+# every dummy is 0 or 1, at most one dummy per selectbox question is set,
+# numeric answers are whole numbers within the number_input bounds, and
+# ORDERING_CONSTRAINTS hold. Column indices, bounds and rule names are worked
+# out once here. validate() then checks a matrix a block of rows at a time,
+# with a few vectorized comparisons per column, and never stops at a bad row.
+# A CompactMatrix is checked in its int8/int16 storage without upcasting.
+class Schema:
+    def __init__(self, feature_columns=FEATURE_COLUMNS, categorical=CATEGORICAL_QUESTIONS, numeric=NUMERIC_QUESTIONS,
+                 constraints=ORDERING_CONSTRAINTS):
+        self.feature_columns = list(feature_columns)
+        column_index = {column: i for i, column in enumerate(self.feature_columns)}
+
+        # (question, dummy column indices), in the order of the rules
+        self._groups = [(question, [column_index[column] for column in dict.fromkeys(options.values()) if column is not None])
+                        for question, options in categorical.items()]
+        self._numeric = [(column_index[column], bounds["min_value"], bounds["max_value"]) for column, bounds in numeric.items()]
+        self._constraints = [(column_index[column], column_index[limit]) for column, limit in constraints]
+        self._n_dummies = sum(len(indices) for _, indices in self._groups)
+
+        self.rules = ([f"{self.feature_columns[i]} is not 0 or 1" for _, indices in self._groups for i in indices]
+                      + [f"{question} has more than one answer" for question, _ in self._groups]
+                      + [f"{column} is not a whole number in [{bounds['min_value']}, {bounds['max_value']}]"
+                         for column, bounds in numeric.items()]
+                      + [f"{column} > {limit}" for column, limit in constraints])
+
+    @staticmethod
+    def _not_binary(values, out):
+        if values.dtype == np.int8:
+            # Negative int8 values are > 1 as uint8
+            np.greater(values.view(np.uint8), 1, out=out)
+        else:
+            np.not_equal(values, 0, out=out)
+            out &= values != 1
+
+    @staticmethod
+    def _out_of_bounds(values, low, high, out):
+        np.less(values, low, out=out)
+        out |= values > high
+        if values.dtype.kind == "f":
+            out |= values != np.round(values)
+        # NaN fails every comparison above
+        out |= values != values
+
+    def _check_block(self, block, out):
+        answers = np.zeros(len(block), dtype=np.int16)
+        rule = 0
+        for g, (_, indices) in enumerate(self._groups):
+            answers[:] = 0
+            for i in indices:
+                values = block[:, i]
+                self._not_binary(values, out[rule])
+                answers += values != 0
+                rule += 1
+            np.greater(answers, 1, out=out[self._n_dummies + g])
+        rule = self._n_dummies + len(self._groups)
+        for i, low, high in self._numeric:
+            self._out_of_bounds(block[:, i], low, high, out[rule])
+            rule += 1
+        for i, limit in self._constraints:
+            np.greater(block[:, i], block[:, limit], out=out[rule])
+            rule += 1
+
+    # Check a (n_rows, n_features) array or CompactMatrix; returns a Validation
+    def validate(self, X, block_rows=8192):
+        if not isinstance(X, CompactMatrix):
+            X = np.asarray(X, dtype=np.float64)
+        if len(X.shape) != 2 or X.shape[1] != len(self.feature_columns):
+            raise ValueError(f"Expected rows of {len(self.feature_columns)} features, got shape {X.shape}")
+        by_rule = np.empty((len(self.rules), len(X)), dtype=bool)
+        for start in range(0, len(X), block_rows):
+            self._check_block(X[start:start + block_rows], by_rule[:, start:start + block_rows])
+        return Validation(self.rules, by_rule)
+
+
+# Shared by every session in the process
+SCHEMA = Schema()
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Validate the feature rows of a dataset and time the checks.")
+    parser.add_argument("--data", default=os.path.join(current_dir, "data", "mortality_data.csv"))
+    parser.add_argument("--scale", type=int, default=100, help="repeat the dataset this many times for the timing")
+    parser.add_argument("--corrupt", type=float, default=0.01, help="share of rows to break for the timing run")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    result = SCHEMA.validate(df[FEATURE_COLUMNS].to_numpy())
+    print(f"{args.data}: {len(df) - result.n_invalid:,} of {len(df):,} rows valid")
+    for rule, count in result.rule_counts().items():
+        print(f"  {count:6,} {rule}")
+
+    X = np.tile(df[FEATURE_COLUMNS].to_numpy(dtype=np.float64), (args.scale, 1))
+    rng = np.random.default_rng(0)
+    broken = rng.choice(len(X), int(len(X) * args.corrupt), replace=False)
+    X[broken, rng.integers(0, X.shape[1], len(broken))] += 2
+    for name, matrix in (("float64", X), ("compact", CompactMatrix.from_array(X))):
+        SCHEMA.validate(matrix[:1000])
+        start = time.perf_counter()
+        result = SCHEMA.validate(matrix)
+        seconds = time.perf_counter() - start
+        print(f"{name}: {len(X):,} rows in {seconds * 1e3:.0f}ms ({len(X) / seconds / 1e6:.1f}M rows/s), "
+              f"{result.n_invalid:,} invalid of {len(broken):,} broken")
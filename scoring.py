@@ -0,0 +1,68 @@
+import argparse
+import os
+import pickle
+
+import numpy as np
+
+
+# Number of features a fitted model (or the final step of a pipeline) expects,
+# None when it is not fitted
+def n_features_in(model):
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features is None and hasattr(model, "steps"):
+        n_features = getattr(model.steps[-1][1], "n_features_in_", None)
+    return n_features
+
+
+# Score a single respondent without stacking it onto the whole dataset
+def predict_one(model, new_data):
+    row = np.asarray(new_data).reshape(1, -1)
+    return model.predict(row)[0]
+
+
+# Check that single-row scoring gives the same label as the old batch path
+# (np.vstack of the dataset with the new row, then taking predictions[-1]).
+# Returns the indices of rows whose labels differ.
+def verify_single_row_scoring(model, data, vstack_sample=25, random_state=0):
+    data = np.asarray(data)
+    batch_labels = model.predict(data)
+    mismatches = [i for i, row in enumerate(data) if predict_one(model, row) != batch_labels[i]]
+
+    # Replay the exact old path on a sample of rows, it re-scores the whole dataset per row
+    rng = np.random.default_rng(random_state)
+    sample = rng.choice(len(data), size=min(vstack_sample, len(data)), replace=False)
+    for i in sample:
+        full_data = np.vstack([data, data[i:i + 1]])
+        if model.predict(full_data)[-1] != predict_one(model, data[i]) and i not in mismatches:
+            mismatches.append(int(i))
+
+    return sorted(mismatches)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    from features import FEATURE_COLUMNS
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Verify single-row scoring against the batch vstack path.")
+    parser.add_argument("--model", default=os.path.join(current_dir, "adaboost2.pkl"))
+    parser.add_argument("--data", default=os.path.join(current_dir, "data", "mortality_data.csv"))
+    parser.add_argument("--vstack-sample", type=int, default=25)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"{args.model} not found, train a model with train.py or pass one with --model")
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    # The bundled adaboost_smoteen.pkl is an unfitted pipeline, train.py writes adaboost2.pkl
+    if n_features_in(model) is None:
+        raise SystemExit(f"{args.model} holds an unfitted {type(model).__name__}, train one with train.py "
+                         f"or pass a fitted model with --model")
+    mortality_df = pd.read_csv(args.data)
+    mortality_data = mortality_df[FEATURE_COLUMNS].values
+
+    mismatches = verify_single_row_scoring(model, mortality_data, vstack_sample=args.vstack_sample)
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} of {len(mortality_data)} rows differ, first: {mismatches[:10]}")
+    print(f"All {len(mortality_data)} rows give the same label with single-row scoring.")
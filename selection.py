@@ -0,0 +1,212 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from train import RANDOM_STATE, RESAMPLING, load_resampled, load_training_data, make_classifier, resampled_file
+
+METRICS = ["balanced_accuracy", "recall", "precision", "accuracy", "f1"]
+
+# Candidate configurations: the AdaBoost family of the shipped pipelines
+# (adaboost_smoteen.pkl is n_estimators=1000, learning_rate=0.001, max_depth=3)
+# and random forests like model.pkl
+DEFAULT_GRID = {
+    "adaboost": {"n_estimators": [100, 300, 1000], "learning_rate": [0.001, 0.01, 0.1, 1.0], "max_depth": [1, 3]},
+    "random_forest": {"n_estimators": [100, 300], "max_depth": [5, 10, None]},
+}
+
+
+def expand_grid(grid):
+    candidates = []
+    for family, params in grid.items():
+        for values in itertools.product(*params.values()):
+            candidates.append(dict(zip(params, values), model=family))
+    return candidates
+
+
+def candidate_name(candidate):
+    params = ", ".join(f"{key}={value}" for key, value in candidate.items() if key != "model")
+    return f"{candidate['model']}({params})"
+
+
+def make_estimator(candidate):
+    params = {key: value for key, value in candidate.items() if key != "model"}
+    if candidate["model"] == "adaboost":
+        return make_classifier(random_state=RANDOM_STATE, **params)
+    if candidate["model"] == "random_forest":
+        from sklearn.ensemble import RandomForestClassifier
+
+        return RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1, **params)
+    raise ValueError(f"Unknown model family {candidate['model']!r}")
+
+
+# Dataset loaded once per worker process by the pool initializer
+_worker_data = None
+
+
+def _init_worker(data_path):
+    global _worker_data
+    _worker_data = load_training_data(data_path)
+
+
+# Median single-row predict time, the way the app scores one form submission
+def single_row_latency(model, X, calls=25):
+    from scoring import predict_one
+
+    times = []
+    for row in X[:calls]:
+        start = time.perf_counter()
+        predict_one(model, row)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1e3
+
+
+# Fit a candidate on every fold's (already resampled) training rows and score
+# it on the fold's validation rows; the last fold's model is returned too
+def _evaluate(candidate, folds):
+    from sklearn import metrics
+
+    X, y = _worker_data
+    scores = {metric: [] for metric in METRICS}
+    fit_seconds = []
+    for resampled_path, val_idx in folds:
+        X_res, y_res = load_resampled(resampled_path)
+        start = time.perf_counter()
+        estimator = make_estimator(candidate).fit(X_res, y_res)
+        fit_seconds.append(time.perf_counter() - start)
+        predicted = estimator.predict(X[val_idx])
+        truth = y[val_idx]
+        scores["balanced_accuracy"].append(metrics.balanced_accuracy_score(truth, predicted))
+        scores["recall"].append(metrics.recall_score(truth, predicted, zero_division=0))
+        scores["precision"].append(metrics.precision_score(truth, predicted, zero_division=0))
+        scores["accuracy"].append(metrics.accuracy_score(truth, predicted))
+        scores["f1"].append(metrics.f1_score(truth, predicted, zero_division=0))
+
+    return {"scores": scores, "fit_seconds": float(np.mean(fit_seconds)), "estimator": estimator}
+
+
+# Single-row latency of a fitted candidate as the app would run it (inside the
+# imblearn Pipeline), and compiled (see compiled.py) when it is an AdaBoost model
+def measure_latency(estimator, X):
+    from imblearn.pipeline import Pipeline
+
+    from compiled import compile_model
+    from train import make_sampler
+
+    pipeline = Pipeline([("smoteenn", make_sampler(**RESAMPLING)), ("classifier", estimator)])
+    latency = {"latency_ms": single_row_latency(pipeline, X), "compiled_latency_ms": None}
+    try:
+        latency["compiled_latency_ms"] = single_row_latency(compile_model(estimator), X)
+    except ValueError:
+        pass
+    return latency
+
+
+# Successive halving over stratified K-fold cross-validation. Round r trains
+# every surviving candidate on a stratified subsample of each fold's training
+# rows (max_resources / factor**(rounds-1-r) rows), SMOTEENN-resampled inside
+# the fold only, and keeps the best 1/factor by `scoring` for the next round;
+# the last round uses the full folds. Resampled folds are cached on disk
+# (see train.py), so they are computed once and shared by all candidates.
+# Candidates of a round are fitted in parallel, one per worker process;
+# single-row latency is measured afterwards, one model at a time, so the
+# timings are not skewed by busy workers.
+def successive_halving(data_path, candidates, cache_dir, n_splits=5, factor=3, scoring="balanced_accuracy",
+                       min_resources=500, n_jobs=None, mp_context=None, verbose=True):
+    from sklearn.model_selection import StratifiedKFold, train_test_split
+
+    X, y = load_training_data(data_path)
+    splits = list(StratifiedKFold(n_splits, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+    max_resources = min(len(train_idx) for train_idx, _ in splits)
+    n_rounds = 1 + int(math.floor(math.log(max(len(candidates), 1), factor)))
+    while n_rounds > 1 and max_resources // factor ** (n_rounds - 1) < min_resources:
+        n_rounds -= 1
+
+    results = {i: {"candidate": candidate, "name": candidate_name(candidate), "rounds": []}
+               for i, candidate in enumerate(candidates)}
+    survivors = list(results)
+    with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count() or 1, mp_context=mp_context,
+                             initializer=_init_worker, initargs=(data_path,)) as executor:
+        for round_ in range(n_rounds):
+            resources = max_resources // factor ** (n_rounds - 1 - round_)
+            start = time.perf_counter()
+            folds = []
+            for train_idx, val_idx in splits:
+                if resources < len(train_idx):
+                    train_idx, _ = train_test_split(train_idx, train_size=resources, stratify=y[train_idx],
+                                                    random_state=RANDOM_STATE)
+                path, _ = resampled_file(X[train_idx], y[train_idx], cache_dir, RESAMPLING)
+                folds.append((path, val_idx))
+
+            evaluations = executor.map(_evaluate, [results[i]["candidate"] for i in survivors], itertools.repeat(folds))
+            for i, evaluation in zip(survivors, evaluations):
+                summary = {metric: float(np.mean(values)) for metric, values in evaluation["scores"].items()}
+                summary.update({f"{metric}_std": float(np.std(values)) for metric, values in evaluation["scores"].items()})
+                summary.update(resources=resources, fit_seconds=evaluation["fit_seconds"])
+                results[i]["rounds"].append(summary)
+                results[i]["estimator"] = evaluation["estimator"]
+
+            ranked = sorted(survivors, key=lambda i: results[i]["rounds"][-1][scoring], reverse=True)
+            if verbose:
+                best = results[ranked[0]]
+                print(f"round {round_ + 1}/{n_rounds}: {len(survivors)} candidates on {resources:,} rows per fold "
+                      f"in {time.perf_counter() - start:.1f}s, best {scoring} {best['rounds'][-1][scoring]:.3f} {best['name']}")
+            if round_ < n_rounds - 1:
+                survivors = ranked[:max(1, math.ceil(len(survivors) / factor))]
+
+    for result in results.values():
+        result["rounds"][-1].update(measure_latency(result.pop("estimator"), X))
+    return leaderboard(results.values(), scoring)
+
+
+# One row per candidate with its scores from the last round it reached:
+# candidates that went furthest first, then by score
+def leaderboard(results, scoring="balanced_accuracy"):
+    rows = []
+    for result in results:
+        last = result["rounds"][-1]
+        rows.append(dict({"model": result["name"], "rounds": len(result["rounds"])}, **last))
+    return sorted(rows, key=lambda row: (-row["rounds"], -row[scoring]))
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Pick a model by cross-validated successive halving.")
+    parser.add_argument("--data", default=os.path.join(current_dir, "data", "mortality_data.csv"))
+    parser.add_argument("--cache-dir", default=os.path.join(current_dir, "data", "resampled"))
+    parser.add_argument("--grid", default=None, help="JSON file with {family: {param: [values]}} (default: DEFAULT_GRID)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--factor", type=int, default=3, help="keep the best 1/factor of candidates each round")
+    parser.add_argument("--min-resources", type=int, default=500, help="fewest training rows per fold in the first round")
+    parser.add_argument("--scoring", default="balanced_accuracy", choices=METRICS)
+    parser.add_argument("--n-jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--output", default=None, help="write the leaderboard as JSON")
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    candidates = expand_grid(grid)
+    print(f"{len(candidates)} candidates, {args.folds}-fold CV, halving factor {args.factor}")
+    start = time.perf_counter()
+    board = successive_halving(args.data, candidates, args.cache_dir, args.folds, args.factor, args.scoring,
+                               args.min_resources, args.n_jobs)
+    print(f"Done in {time.perf_counter() - start:.1f}s\n")
+
+    columns = ["model", "rounds", "resources", args.scoring, f"{args.scoring}_std", "recall", "precision", "accuracy",
+               "latency_ms", "compiled_latency_ms", "fit_seconds"]
+    pd.set_option("display.width", 250)
+    pd.set_option("display.max_colwidth", 70)
+    print(pd.DataFrame(board)[list(dict.fromkeys(columns))].to_string(index=False, float_format="{:.3f}".format))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(board, f, indent=1)
+        print(f"\nLeaderboard written to {args.output}")
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from batching import MicroBatcher
+from compiled import compile_model
+from features import CATEGORICAL_QUESTIONS, ENCODER, NUMERIC_QUESTIONS
+from metrics import METRICS
+from resources import load_model
+from schema import SCHEMA
+
+
+# JSON schema of a prediction request, one property per question in the form
+def request_schema():
+    properties = {question: {"type": "string", "enum": list(options)} for question, options in CATEGORICAL_QUESTIONS.items()}
+    for column, bounds in NUMERIC_QUESTIONS.items():
+        properties[column] = {"type": "integer", "minimum": bounds["min_value"], "maximum": bounds["max_value"]}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+# Shape and types of one instance; value bounds and cross-answer rules are
+# checked on the encoded batch by schema.SCHEMA
+def check_answers(answers):
+    if not isinstance(answers, dict):
+        raise ValueError("Each instance must be a JSON object of answers")
+    missing = [question for question in ENCODER.questions if question not in answers]
+    if missing:
+        raise ValueError(f"Missing answers: {missing}")
+    for column in NUMERIC_QUESTIONS:
+        value = answers[column]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{column} must be a number")
+
+
+# Rolling window of request latencies
+class LatencyTracker:
+    def __init__(self, window=10_000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.requests += 1
+            self.errors += int(error)
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies)
+            requests, errors = self.requests, self.errors
+        stats = {"requests": requests, "errors": errors, "window": len(latencies)}
+        if len(latencies):
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+            stats.update({"p50_ms": p50, "p99_ms": p99, "max_ms": latencies.max() * 1e3})
+        return stats
+
+
+# Loaded once at start-up: the compiled ensemble when the model is AdaBoost, else the model itself
+def load_predictor(model_path):
+    model = load_model(model_path)
+    try:
+        return compile_model(model)
+    except ValueError:
+        return model
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so load generators and clients can reuse connections, and no
+    # Nagle delay between the header and body writes of a response
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/schema":
+            self._send_json(200, request_schema())
+        elif self.path == "/metrics":
+            stats = self.server.latency.stats()
+            if self.server.batcher is not None:
+                stats["batching"] = self.server.batcher.stats()
+            self._send_json(200, stats)
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    # POST /predict with one answers object, or {"instances": [answers, ...]}
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+            batch = isinstance(payload, dict) and "instances" in payload
+            instances = payload["instances"] if batch else [payload]
+            if not isinstance(instances, list) or not instances:
+                raise ValueError("instances must be a non-empty list")
+            for answers in instances:
+                check_answers(answers)
+            X = ENCODER.encode_many(instances)
+            validation = SCHEMA.validate(X)
+            if validation.n_invalid:
+                self.server.latency.record(time.perf_counter() - start, error=True)
+                self._send_json(400, {
+                    "error": f"{validation.n_invalid} of {len(X)} instances are invalid",
+                    "invalid": [{"instance": i, "errors": errors} for i, errors in validation.invalid_rows().items()],
+                })
+                return
+            if self.server.batcher is not None and len(X) == 1:
+                # Coalesced with other concurrent single-row requests
+                labels = [self.server.batcher.predict(X[0])]
+            else:
+                labels = self.server.predictor.predict(X)
+        except (ValueError, KeyError, TypeError) as e:
+            self.server.latency.record(time.perf_counter() - start, error=True)
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            # The model or the batcher failed (e.g. a batch timeout): still answer the client
+            self.server.latency.record(time.perf_counter() - start, error=True)
+            METRICS.inc("service_errors_total")
+            self._send_json(500, {"error": f"Prediction failed: {type(e).__name__}: {e}"})
+            return
+
+        results = [{"prediction": int(label), "risk": "at risk" if label == 1 else "not at risk"} for label in labels]
+        self.server.latency.record(time.perf_counter() - start)
+        self._send_json(200, {"predictions": results} if batch else results[0])
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, predictor, verbose=False, batcher=None):
+        super().__init__(address, PredictionHandler)
+        self.predictor = predictor
+        self.batcher = batcher
+        self.latency = LatencyTracker()
+        self.verbose = verbose
+
+    def server_close(self):
+        super().server_close()
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="HTTP/JSON child mortality risk prediction service.")
+    parser.add_argument("--model", default=os.path.join(current_dir, "adaboost2.pkl"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0, help="coalesce single-row requests for up to this long (0 disables)")
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    predictor = load_predictor(args.model)
+    batcher = MicroBatcher(predictor, args.max_batch, args.batch_window_ms / 1e3) if args.batch_window_ms > 0 else None
+    server = PredictionServer((args.host, args.port), predictor, verbose=args.verbose, batcher=batcher)
+    print(f"Serving predictions on http://{args.host}:{server.server_address[1]} (POST /predict, GET /schema, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# End-to-end budget for a cold start of an app script: a fresh interpreter
+# importing the script and completing its first main() run. Unpickling the
+# model imports sklearn and imblearn (~1s alone); with a NumPy export next to
+# the pickle (python compiled.py adaboost2.pkl) the app stays well inside it.
+STARTUP_BUDGET_SECONDS = 1.5
+
+# Modules worth knowing about when they show up during startup
+HEAVY_MODULES = ["numpy", "pandas", "scipy", "sklearn", "imblearn", "pyarrow"]
+
+
+# Parse the stderr of `python -X importtime`, one record per imported module
+# with its nesting depth and self/cumulative import time in microseconds
+def parse_importtime(stderr):
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        records.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return records
+
+
+# Import times of everything a statement imports, measured in a fresh interpreter
+def import_times(statement="import app", cwd=ROOT):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=cwd, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+# The slowest imports by cumulative time; nested modules are counted inside their parents
+def slowest_imports(records, top=15, max_depth=None):
+    if max_depth is not None:
+        records = [r for r in records if r["depth"] <= max_depth]
+    return sorted(records, key=lambda r: r["cumulative_us"], reverse=True)[:top]
+
+
+_COLD_START = """
+import time
+start = time.perf_counter()
+import importlib, json, sys
+sys.path.insert(0, {directory!r})
+module = importlib.import_module({module!r})
+imported = time.perf_counter()
+module.main()
+finished = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": imported - start,
+    "first_run_seconds": finished - imported,
+    "total_seconds": finished - start,
+    "modules": {{name: name in sys.modules for name in {heavy!r}}},
+}}))
+"""
+
+
+# Cold start of a Streamlit script in a fresh interpreter: import it, then run
+# main() once in bare mode (widgets return their defaults, nothing is clicked)
+def cold_start(script):
+    script = os.path.abspath(script)
+    directory, filename = os.path.split(script)
+    code = _COLD_START.format(directory=directory, module=os.path.splitext(filename)[0], heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the slowest imports and the cold start time of an app script.")
+    parser.add_argument("script", nargs="?", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-depth", type=int, default=None, help="only list modules nested at most this deep")
+    args = parser.parse_args()
+
+    module = os.path.splitext(os.path.basename(args.script))[0]
+    records = import_times(f"import {module}", cwd=os.path.dirname(os.path.abspath(args.script)))
+    print(f"Slowest imports of {module} ({len(records)} modules):")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for record in slowest_imports(records, args.top, args.max_depth):
+        print(f"{record['cumulative_us'] / 1e3:10.1f}ms {record['self_us'] / 1e3:8.1f}ms  {'  ' * record['depth']}{record['module']}")
+
+    result = cold_start(args.script)
+    loaded = ", ".join(name for name, present in result["modules"].items() if present) or "none"
+    print(f"\nCold start: import {result['import_seconds'] * 1e3:.0f}ms + first run {result['first_run_seconds'] * 1e3:.0f}ms "
+          f"= {result['total_seconds'] * 1e3:.0f}ms (budget {STARTUP_BUDGET_SECONDS * 1e3:.0f}ms); heavy modules loaded: {loaded}")
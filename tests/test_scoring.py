@@ -0,0 +1,60 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from scoring import n_features_in, predict_one, verify_single_row_scoring
+from train import load_training_data, make_classifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT, "data", "mortality_data.csv")
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return load_training_data(DATA_PATH)
+
+
+# A small model with the app's classifier settings, fitted on the dataset
+@pytest.fixture(scope="module")
+def small_model(dataset):
+    X, y = dataset
+    return make_classifier(n_estimators=20).fit(X, y)
+
+
+# Fitted models shipped next to the apps, if any
+def fitted_model_paths():
+    paths = []
+    for name in ("adaboost2.pkl", "adaboost_smoteen.pkl"):
+        path = os.path.join(ROOT, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                if n_features_in(pickle.load(f)) is not None:
+                    paths.append(path)
+    return paths
+
+
+def test_predict_one_matches_batch_labels(dataset, small_model):
+    X, _ = dataset
+    batch_labels = small_model.predict(X)
+    single_labels = np.array([predict_one(small_model, row) for row in X])
+    assert np.array_equal(single_labels, batch_labels)
+
+
+def test_predict_one_matches_vstack_path(dataset, small_model):
+    X, _ = dataset
+    assert verify_single_row_scoring(small_model, X[:500], vstack_sample=10) == []
+
+
+@pytest.mark.parametrize("path", fitted_model_paths() or [pytest.param(None, marks=pytest.mark.skip("no fitted model file"))])
+def test_shipped_model_single_row_scoring(dataset, path):
+    X, _ = dataset
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+    assert verify_single_row_scoring(model, X, vstack_sample=5) == []
+
+
+def test_n_features_in(small_model):
+    assert n_features_in(small_model) == 45
+    assert n_features_in(make_classifier()) is None
@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from features import FEATURE_COLUMNS
+
+# Settings of the shipped adaboost_smoteen.pkl pipeline
+RANDOM_STATE = 143
+RESAMPLING = {"random_state": RANDOM_STATE, "k_neighbors": 5, "enn_neighbors": 3}
+ADABOOST = {"n_estimators": 1000, "learning_rate": 0.001, "max_depth": 3, "random_state": RANDOM_STATE}
+
+
+# Wall-clock seconds per stage, printed as each stage finishes
+class StageTimes(dict):
+    def __init__(self, verbose=True):
+        super().__init__()
+        self.verbose = verbose
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self[name] = self.get(name, 0.0) + time.perf_counter() - start
+        if self.verbose:
+            print(f"{name:<12} {self[name]:8.2f}s")
+
+
+def load_training_data(path, target="b5"):
+    from columnar import read_dataset
+
+    df = read_dataset(path)
+    return df[FEATURE_COLUMNS].to_numpy(dtype=np.float64), df[target].to_numpy()
+
+
+# SMOTEENN as in the shipped pipeline (SMOTEENN(random_state=143) resamples
+# identically), with n_jobs going to the nearest-neighbour searches of both
+# SMOTE and ENN through explicit NearestNeighbors estimators
+def make_sampler(random_state=RANDOM_STATE, k_neighbors=5, enn_neighbors=3, n_jobs=None):
+    from imblearn.combine import SMOTEENN
+    from imblearn.over_sampling import SMOTE
+    from imblearn.under_sampling import EditedNearestNeighbours
+    from sklearn.neighbors import NearestNeighbors
+
+    return SMOTEENN(
+        random_state=random_state,
+        smote=SMOTE(random_state=random_state, k_neighbors=NearestNeighbors(n_neighbors=k_neighbors + 1, n_jobs=n_jobs)),
+        enn=EditedNearestNeighbours(sampling_strategy="all", n_neighbors=NearestNeighbors(n_neighbors=enn_neighbors + 1, n_jobs=n_jobs)),
+    )
+
+
+def make_classifier(n_estimators=1000, learning_rate=0.001, max_depth=3, random_state=RANDOM_STATE):
+    from sklearn.ensemble import AdaBoostClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    return AdaBoostClassifier(estimator=DecisionTreeClassifier(max_depth=max_depth, random_state=random_state),
+                              algorithm="SAMME", learning_rate=learning_rate, n_estimators=n_estimators,
+                              random_state=random_state)
+
+
+# Resampled matrices only depend on the training rows and the resampling settings
+def resample_key(X, y, resampling):
+    import imblearn
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.int64).tobytes())
+    digest.update(json.dumps(dict(resampling, imblearn=imblearn.__version__), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+# Path of the cached SMOTEENN output for (X, y), resampling first unless an
+# earlier run resampled the same rows with the same settings; returns (path, cache hit)
+def resampled_file(X, y, cache_dir, resampling=RESAMPLING, n_jobs=None):
+    path = os.path.join(cache_dir, resample_key(X, y, resampling) + ".npz")
+    if os.path.exists(path):
+        return path, True
+    X_res, y_res = make_sampler(n_jobs=n_jobs, **resampling).fit_resample(X, y)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, X=X_res, y=y_res)
+    os.replace(tmp_path, path)
+    return path, False
+
+
+def load_resampled(path):
+    with np.load(path, allow_pickle=False) as cached:
+        return cached["X"], cached["y"]
+
+
+# SMOTEENN output for (X, y) through the on-disk cache; returns (X, y, cache hit)
+def resample_cached(X, y, cache_dir, resampling=RESAMPLING, n_jobs=None):
+    path, cache_hit = resampled_file(X, y, cache_dir, resampling, n_jobs)
+    return (*load_resampled(path), cache_hit)
+
+
+def evaluate(model, X, y, positive=1):
+    from sklearn.metrics import balanced_accuracy_score, confusion_matrix, precision_score, recall_score
+
+    predicted = model.predict(X)
+    return {
+        "balanced_accuracy": balanced_accuracy_score(y, predicted),
+        "recall": recall_score(y, predicted, pos_label=positive),
+        "precision": precision_score(y, predicted, pos_label=positive, zero_division=0),
+        "confusion_matrix": confusion_matrix(y, predicted).tolist(),
+    }
+
+
+# Fit the SMOTEENN + AdaBoost pipeline. The resampling is cached on disk, so
+# trying other AdaBoost settings only refits the classifier. The returned
+# imblearn Pipeline is the same shape as adaboost_smoteen.pkl; at predict
+# time its sampler step is skipped, as in any imblearn Pipeline.
+def train(data_path, cache_dir, test_size=0.2, n_jobs=None, adaboost=ADABOOST, resampling=RESAMPLING, verbose=True):
+    from imblearn.pipeline import Pipeline
+    from sklearn.model_selection import train_test_split
+
+    times = StageTimes(verbose)
+    with times.stage("load_data"):
+        X, y = load_training_data(data_path)
+    if test_size:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, stratify=y,
+                                                            random_state=resampling["random_state"])
+    else:
+        X_train, y_train, X_test, y_test = X, y, None, None
+
+    with times.stage("resample"):
+        X_res, y_res, cache_hit = resample_cached(X_train, y_train, cache_dir, resampling, n_jobs)
+    with times.stage("fit"):
+        classifier = make_classifier(**adaboost).fit(X_res, y_res)
+    pipeline = Pipeline([("smoteenn", make_sampler(n_jobs=n_jobs, **resampling)), ("adaboostclassifier", classifier)])
+
+    report = {
+        "rows": len(X),
+        "train_rows": len(X_train),
+        "resampled_rows": len(X_res),
+        "resampled_positives": int((y_res == 1).sum()),
+        "resample_cache_hit": cache_hit,
+        "adaboost": dict(adaboost),
+    }
+    if X_test is not None:
+        with times.stage("evaluate"):
+            report["test"] = evaluate(pipeline, X_test, y_test)
+    report["seconds"] = dict(times)
+    return pipeline, report
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Train the SMOTEENN + AdaBoost child mortality model.")
+    parser.add_argument("--data", default=os.path.join(current_dir, "data", "mortality_data.csv"))
+    parser.add_argument("--output", default=os.path.join(current_dir, "adaboost2.pkl"))
+    parser.add_argument("--cache-dir", default=os.path.join(current_dir, "data", "resampled"))
+    parser.add_argument("--test-size", type=float, default=0.2, help="stratified hold-out share, 0 to train on every row")
+    parser.add_argument("--n-jobs", type=int, default=None, help="parallel jobs for the nearest-neighbour searches")
+    parser.add_argument("--n-estimators", type=int, default=ADABOOST["n_estimators"])
+    parser.add_argument("--learning-rate", type=float, default=ADABOOST["learning_rate"])
+    parser.add_argument("--max-depth", type=int, default=ADABOOST["max_depth"])
+    parser.add_argument("--export", action="store_true", help="also write the NumPy export (<output>.arrays) next to the pickle")
+    args = parser.parse_args()
+
+    adaboost = dict(ADABOOST, n_estimators=args.n_estimators, learning_rate=args.learning_rate, max_depth=args.max_depth)
+    pipeline, report = train(args.data, args.cache_dir, args.test_size, args.n_jobs, adaboost)
+
+    times = StageTimes()
+    with times.stage("save"):
+        content = pickle.dumps(pipeline)
+        with open(args.output, "wb") as f:
+            f.write(content)
+        if args.export:
+            from compiled import compile_model
+
+            compile_model(pipeline).save(os.path.splitext(args.output)[0] + ".arrays",
+                                         source_sha256=hashlib.sha256(content).hexdigest())
+    report["seconds"].update(times)
+
+    print(f"\n{report['train_rows']:,} training rows resampled to {report['resampled_rows']:,} "
+          f"({report['resampled_positives']:,} positive), {'from cache' if report['resample_cache_hit'] else 'computed'}")
+    if "test" in report:
+        test = report["test"]
+        print(f"Hold-out: balanced accuracy {test['balanced_accuracy']:.3f}, recall {test['recall']:.3f}, "
+              f"precision {test['precision']:.3f}, confusion matrix {test['confusion_matrix']}")
+    print(f"Saved {args.output}; total {sum(report['seconds'].values()):.1f}s")